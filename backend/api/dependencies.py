@@ -1,12 +1,11 @@
 """
-FastAPI dependencies for auth and database
+FastAPI dependencies for auth and request parameters
 """
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from core.config import settings, REQUIRE_AUTH
 from core.security import verify_token
-from core.database import get_db_connection
 
 security = HTTPBearer(auto_error=False)
 
@@ -24,7 +23,34 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    token = credentials.credentials
+    return _validate_token(credentials.credentials)
+
+async def get_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    access_token: Optional[str] = Query(
+        None, description="Stream token from POST /api/projects/stream/token, for clients that cannot send headers (EventSource)"
+    )
+) -> Optional[dict]:
+    """Like get_current_user, but also accepts a short-lived stream token as ?access_token=
+
+    Query strings end up in access logs, so the service token itself is
+    only accepted in the Authorization header.
+    """
+    if not REQUIRE_AUTH:
+        return {"service": "frontend_service", "type": "service_token", "mode": "dev"}
+
+    if credentials:
+        return _validate_token(credentials.credentials)
+    if not access_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing auth token.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return _validate_token(access_token, token_type="stream_token")
+
+def _validate_token(token: str, token_type: str = "service_token") -> dict:
     payload = verify_token(token)
 
     if payload is None:
@@ -34,7 +60,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if payload.get("type") != "service_token":
+    if payload.get("type") != token_type:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid token type."
@@ -42,16 +68,13 @@ async def get_current_user(
 
     return payload
 
-async def get_db():
-    """Database connection dependency"""
-    conn = get_db_connection()
-    if not conn:
+def get_layout(
+    layout: str = Query("rows", description="rows (list of objects) or columns (one array per field)")
+) -> str:
+    """Response layout for list endpoints"""
+    if layout not in ("rows", "columns"):
         raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Database unavailable."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid layout. Valid: rows, columns"
         )
-
-    try:
-        yield conn
-    finally:
-        conn.close()
+    return layout
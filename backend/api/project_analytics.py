@@ -1,326 +1,553 @@
 """
 Project analytics endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from typing import Optional
-from datetime import date
-from mysql.connector.connection import MySQLConnection
-from api.dependencies import get_db, get_current_user
-from core.database import get_db_cursor
+import base64
+import json
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, Tuple
+from datetime import date, datetime
+from api.dependencies import get_current_user, get_layout
+from api.responses import (
+    FastJSONResponse, make_etag, etag_matches, not_modified, apply_layout,
+    render_json, encoded_response, retry_after_headers
+)
+from core.config import settings
+from core.cache import analytics_cache
+from core.analytics import (
+    SECTIONS, PROJECTS_QUERY, load_dataset, load_data_version, budget_totals,
+    project_row, build_leaderboard, build_timeline, build_risks, build_dashboard
+)
+from core.database import DatabaseUnavailable, CircuitOpen, QueryTimeout, run_db, fetch_all, fetch_one
+from core.admission import LIGHT, HEAVY, Saturated, limiters
+from core.snapshot import snapshot_enabled, snapshot_reader
+from core.singleflight import query_flight
+from core.risk_engine import RiskRules, build_risk_frame, score_risks
+from core.timeline_index import TimelineIndex
 
 router = APIRouter(prefix="/api/projects", tags=["Projects"])
 
+MAX_PAGE_SIZE = 1000
+STATUS_CATEGORIES = ("active", "overdue", "completed")
+RISK_ORDERS = ("overdue", "score")
+DEFAULT_RISK_RULES = RiskRules()
+
+# Sortable columns (indexed in the schema) for keyset pagination
+SORT_COLUMNS = {
+    "project_id": "p.project_id",
+    "project_name": "p.project_name",
+    "client_id": "p.client_id",
+    "project_manager": "p.project_manager",
+    "start_date": "p.start_date",
+    "end_date": "p.end_date",
+    "status": "p.status",
+    "updated_at": "p.updated_at"
+}
+
+PROJECT_FIELDS = (
+    "project_id", "project_name", "client_id", "client_name", "project_manager", "manager_name",
+    "start_date", "end_date", "status", "created_at", "updated_at",
+    "total_allocated", "total_burnt", "total_remaining", "budget_variance",
+    "status_category", "days_overdue"
+)
+BUDGET_FIELDS = frozenset({"total_allocated", "total_burnt", "total_remaining", "budget_variance"})
+
+class ProjectListParams(BaseModel):
+    """Validated GET /api/projects query; hashable so it can key the cache"""
+    model_config = ConfigDict(frozen=True)
+
+    status_filter: Optional[int] = None
+    status_category: Optional[str] = None
+    client_id: Optional[int] = None
+    project_manager: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    sort: Optional[str] = None
+    order: str = "asc"
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
+    fields: Optional[Tuple[str, ...]] = None
+
+# Endpoint keys served straight from a section of the shared snapshot (multi-worker mode)
+SNAPSHOT_SECTIONS = {
+    ("projects", ProjectListParams()): "projects",
+    ("summary",): "summary",
+    ("manager-leaderboard",): "leaderboard",
+    ("timeline",): "timeline",
+    ("risks",): "risks"
+}
+
+def _parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    if not fields:
+        return None
+    selected = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = selected - set(PROJECT_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Valid: {', '.join(PROJECT_FIELDS)}"
+        )
+    return tuple(name for name in PROJECT_FIELDS if name in selected)
+
+def _encode_cursor(params: ProjectListParams, value, project_id: int) -> str:
+    if isinstance(value, (date, datetime)):
+        value = str(value)
+    payload = {"sort": params.sort or "project_id", "order": params.order, "value": value, "id": project_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str, params: ProjectListParams) -> tuple:
+    """Return (last sort value, last project_id); the cursor must match the current sort"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        valid = (
+            payload["sort"] == (params.sort or "project_id")
+            and payload["order"] == params.order
+            and isinstance(payload["id"], int)
+        )
+    except Exception:
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor for this sort order.")
+    return payload["value"], payload["id"]
+
+def _keyset_condition(column: str, descending: bool, last_value, last_id: int) -> tuple:
+    """WHERE clause selecting rows after (last_value, last_id); NULLs sort first ascending, as in MySQL"""
+    if column == "p.project_id":
+        return ("p.project_id < %s" if descending else "p.project_id > %s"), [last_id]
+    if not descending:
+        if last_value is None:
+            return f"(({column} IS NULL AND p.project_id > %s) OR {column} IS NOT NULL)", [last_id]
+        return f"({column} > %s OR ({column} = %s AND p.project_id > %s))", [last_value, last_value, last_id]
+    if last_value is None:
+        return f"({column} IS NULL AND p.project_id < %s)", [last_id]
+    return (
+        f"({column} < %s OR ({column} = %s AND p.project_id < %s) OR {column} IS NULL)",
+        [last_value, last_value, last_id]
+    )
+
+async def _run_admitted(loader, *args):
+    """Run a loader once its endpoint class admits it (HEAVY_LOADERS, else light)"""
+    async with limiters[HEAVY if loader in HEAVY_LOADERS else LIGHT].slot():
+        return await run_db(loader, *args, read_only=True)
+
+async def _query(error: str, loader, *args):
+    """Run a loader on the DB executor and map failures to HTTP errors
+
+    Concurrent calls with the same loader and arguments share one execution.
+    Overload (full admission queue, open circuit, statement timeout) is a
+    503 with Retry-After.
+    """
+    try:
+        if settings.QUERY_COALESCING_ENABLED:
+            return await query_flight.do((loader, args), loader.__name__, _run_admitted, loader, *args)
+        return await _run_admitted(loader, *args)
+    except Saturated as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server busy, retry shortly.",
+                            headers=retry_after_headers(e.retry_after))
+    except CircuitOpen as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable.",
+                            headers=retry_after_headers(e.retry_after))
+    except QueryTimeout:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"{error}: query timed out",
+                            headers=retry_after_headers(settings.ADMISSION_RETRY_AFTER))
+    except DatabaseUnavailable:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable.",
+                            headers=retry_after_headers(settings.ADMISSION_RETRY_AFTER))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"{error}: {str(e)}")
+
+async def _cached_query(key: tuple, error: str, loader, *args):
+    """Serve a loader result from the analytics cache, loading it on a miss"""
+    if not settings.ANALYTICS_CACHE_ENABLED:
+        return await _query(error, loader, *args)
+
+    hit, value = analytics_cache.get(key)
+    if hit:
+        return value
+
+    value = await _query(error, loader, *args)
+    analytics_cache.set(key, value)
+    return value
+
+async def _data_version() -> str:
+    """Current data version, probed at most once per ANALYTICS_VERSION_TTL (every request with the cache off)"""
+    if not settings.ANALYTICS_CACHE_ENABLED:
+        return await _query("Failed to probe data version", load_data_version)
+
+    hit, version = analytics_cache.get(("data-version",))
+    if hit:
+        return version
+
+    version = await _query("Failed to probe data version", load_data_version)
+    analytics_cache.set(("data-version",), version, ttl=settings.ANALYTICS_VERSION_TTL)
+    return version
+
+def _snapshot_body(key: tuple) -> Optional[Tuple[str, bytes]]:
+    """(data version, encoded body) for key from the shared snapshot, if it covers it and is fresh"""
+    if not snapshot_enabled():
+        return None
+    if key[0] == "dashboard":
+        names = key[1]
+    elif key in SNAPSHOT_SECTIONS:
+        names = None
+    else:
+        return None
+
+    view = snapshot_reader.current()
+    if view is None:
+        return None
+    if names is None:
+        return view.version, view.section(SNAPSHOT_SECTIONS[key])
+    return view.version, b"{" + b",".join(orjson.dumps(name) + b":" + view.section(name) for name in names) + b"}"
+
+async def _conditional_query(request: Request, key: tuple, error: str, loader, *args, layout: str = "rows"):
+    """Answer If-None-Match with 304 before loading anything, else serve the result with an ETag"""
+    if layout == "rows":
+        snapshot = _snapshot_body(key)
+        if snapshot is not None:
+            version, body = snapshot
+            etag = make_etag(version, key + (layout,))
+            if etag_matches(request, etag):
+                return not_modified(request, etag)
+
+            async def snapshot_render():
+                return body
+            return await encoded_response(request, key[0], etag, snapshot_render)
+
+    version = await _data_version()
+    etag = make_etag(version, key + (layout,))
+    if etag_matches(request, etag):
+        return not_modified(request, etag)
+
+    async def render():
+        # Version is part of the cache key so a body is never served under a newer ETag
+        value = await _cached_query(key + (version,), error, loader, *args)
+        return render_json(apply_layout(value, layout))
+    return await encoded_response(request, key[0], etag, render)
+
+# Loaders run on the DB executor with a pooled connection
+
+def _load_projects(conn, params: ProjectListParams):
+    today = date.today()
+    where, args = [], []
+
+    if params.status_filter is not None:
+        where.append("p.status = %s")
+        args.append(params.status_filter)
+    if params.client_id is not None:
+        where.append("p.client_id = %s")
+        args.append(params.client_id)
+    if params.project_manager is not None:
+        where.append("p.project_manager = %s")
+        args.append(params.project_manager)
+    # Date range keeps projects whose [start_date, end_date] overlaps it
+    if params.date_from is not None:
+        where.append("(p.end_date >= %s OR p.end_date IS NULL)")
+        args.append(params.date_from)
+    if params.date_to is not None:
+        where.append("(p.start_date <= %s OR p.start_date IS NULL)")
+        args.append(params.date_to)
+    if params.status_category == "completed":
+        where.append("p.status = 0")
+    elif params.status_category == "overdue":
+        where.append("(p.status IS NULL OR p.status != 0) AND p.end_date < %s")
+        args.append(today)
+    elif params.status_category == "active":
+        where.append("(p.status IS NULL OR p.status != 0) AND (p.end_date >= %s OR p.end_date IS NULL)")
+        args.append(today)
+
+    paginated = params.limit is not None
+    sort_column = SORT_COLUMNS[params.sort or "project_id"]
+    descending = params.order == "desc"
+
+    if params.cursor is not None:
+        last_value, last_id = _decode_cursor(params.cursor, params)
+        keyset, keyset_args = _keyset_condition(sort_column, descending, last_value, last_id)
+        where.append(keyset)
+        args.extend(keyset_args)
+
+    query = PROJECTS_QUERY
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    if paginated or params.sort:
+        direction = "DESC" if descending else "ASC"
+        query += f" ORDER BY {sort_column} {direction}"
+        if sort_column != "p.project_id":
+            query += f", p.project_id {direction}"
+    if paginated:
+        # One extra row tells us whether another page exists
+        query += " LIMIT %s"
+        args.append(params.limit + 1)
+
+    rows = fetch_all(conn, query, tuple(args), label="project_list")
+    has_more = paginated and len(rows) > params.limit
+    if has_more:
+        rows = rows[:params.limit]
+
+    fields = params.fields
+    if fields is None or BUDGET_FIELDS.intersection(fields):
+        # Pages only need totals for their own projects
+        budgets = budget_totals(conn, [r['project_id'] for r in rows] if paginated else None)
+    else:
+        budgets = {}
+
+    projects = [project_row(r, budgets.get(r['project_id']), today) for r in rows]
+    if fields is not None:
+        projects = [{f: project[f] for f in fields} for project in projects]
+
+    if not paginated:
+        return projects
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = _encode_cursor(params, last[params.sort or "project_id"], last['project_id'])
+    return {"items": projects, "next_cursor": next_cursor}
+
+def _load_summary(conn) -> dict:
+    today = date.today()
+
+    summary = fetch_one(conn, """
+        SELECT
+            COUNT(*) as total,
+            SUM(CASE WHEN status = 0 THEN 1 ELSE 0 END) as completed,
+            SUM(CASE WHEN status != 0 AND end_date < %s THEN 1 ELSE 0 END) as overdue,
+            SUM(CASE WHEN status != 0 AND (end_date >= %s OR end_date IS NULL) THEN 1 ELSE 0 END) as active
+        FROM projects
+    """, (today, today), label="summary_projects")
+
+    budget = fetch_one(conn, """
+        SELECT
+            COALESCE(SUM(allocated_amount), 0) as total_allocated,
+            COALESCE(SUM(burnt_amount), 0) as total_burnt,
+            COALESCE(SUM(remaining_amount), 0) as total_remaining
+        FROM budgets
+    """, label="summary_budgets")
+
+    return {
+        'total_projects': summary['total'],
+        'active_projects': summary['active'],
+        'overdue_projects': summary['overdue'],
+        'completed_projects': summary['completed'],
+        'total_budget_allocated': float(budget['total_allocated']),
+        'total_budget_burnt': float(budget['total_burnt']),
+        'total_budget_remaining': float(budget['total_remaining'])
+    }
+
+def _load_project_budget(conn, project_id: int) -> list:
+    # fetch_all returns the DECIMAL amounts as floats (DB_DECIMAL_AS_FLOAT)
+    return fetch_all(conn, """
+        SELECT budget_id, budget_name, budget_type,
+               COALESCE(allocated_amount, 0) as allocated_amount,
+               COALESCE(burnt_amount, 0) as burnt_amount,
+               COALESCE(remaining_amount, 0) as remaining_amount,
+               status
+        FROM budgets WHERE project_id = %s
+    """, (project_id,), label="project_budget")
+
+def _load_manager_leaderboard(conn) -> list:
+    return build_leaderboard(load_dataset(conn), date.today())
+
+def _load_timeline(conn) -> list:
+    return build_timeline(load_dataset(conn))
+
+def _load_timeline_index(conn) -> TimelineIndex:
+    return TimelineIndex(build_timeline(load_dataset(conn)))
+
+def _load_risks(conn) -> list:
+    return build_risks(load_dataset(conn), date.today())
+
+def _load_risk_frame(conn):
+    return build_risk_frame(load_dataset(conn))
+
+def _load_dashboard(conn, sections: tuple) -> dict:
+    return build_dashboard(load_dataset(conn), date.today(), sections)
+
+# Loaders that read the whole dataset; admitted under the heavy class
+HEAVY_LOADERS = {
+    _load_projects, _load_manager_leaderboard, _load_timeline, _load_timeline_index,
+    _load_risks, _load_risk_frame, _load_dashboard
+}
+
+async def _timeline_index(version: str) -> TimelineIndex:
+    """Interval index for a data version, built once and replaced when the version changes"""
+    key = ("timeline", "index", version)
+    hit, index = analytics_cache.get(key)
+    if hit:
+        return index
+    index = await _query("Failed to fetch timeline", _load_timeline_index)
+    # The key carries the version, so a long TTL never serves stale rows
+    analytics_cache.set(key, index, ttl=settings.TIMELINE_INDEX_TTL)
+    return index
+
+def _parse_sections(sections: Optional[str]) -> tuple:
+    if not sections:
+        return SECTIONS
+    selected = {name.strip() for name in sections.split(",") if name.strip()}
+    unknown = selected - set(SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sections: {', '.join(sorted(unknown))}. Valid: {', '.join(SECTIONS)}"
+        )
+    return tuple(name for name in SECTIONS if name in selected)
+
 @router.get("/health")
 async def health_check(current_user: dict = Depends(get_current_user)):
     return {"status": "healthy", "service": "Project Analytics API"}
 
 @router.get("")
 async def get_projects(
+    request: Request,
     status_filter: Optional[int] = Query(None, description="Filter by project status"),
-    db: MySQLConnection = Depends(get_db),
+    status_category: Optional[str] = Query(None, description="Filter by category: active, overdue or completed"),
+    client_id: Optional[int] = Query(None, description="Filter by client"),
+    project_manager: Optional[int] = Query(None, description="Filter by project manager (employee id)"),
+    date_from: Optional[date] = Query(None, description="Only projects running on or after this date"),
+    date_to: Optional[date] = Query(None, description="Only projects running on or before this date"),
+    sort: Optional[str] = Query(None, description=f"Sort column: {', '.join(SORT_COLUMNS)}"),
+    order: str = Query("asc", description="Sort direction: asc or desc"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables pagination"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    layout: str = Depends(get_layout),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all projects with budget info"""
-    try:
-        cursor = get_db_cursor(db)
-        if not cursor:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="DB error.")
-
-        query = """
-            SELECT 
-                p.project_id, p.project_name, p.client_id, c.client_name,
-                p.project_manager, CONCAT(e.first_name, ' ', e.last_name) as manager_name,
-                p.start_date, p.end_date, p.status, p.created_at, p.updated_at
-            FROM projects p
-            LEFT JOIN clients c ON p.client_id = c.client_id
-            LEFT JOIN employees e ON p.project_manager = e.employee_id
-        """
-        
-        if status_filter is not None:
-            query += " WHERE p.status = %s"
-            cursor.execute(query, (status_filter,))
-        else:
-            cursor.execute(query)
-
-        projects = cursor.fetchall()
-        today = date.today()
-
-        for project in projects:
-            # Get budget totals
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(allocated_amount), 0) as total_allocated,
-                    COALESCE(SUM(burnt_amount), 0) as total_burnt,
-                    COALESCE(SUM(remaining_amount), 0) as total_remaining
-                FROM budgets WHERE project_id = %s
-            """, (project['project_id'],))
-            budget = cursor.fetchone()
-            
-            project['total_allocated'] = float(budget['total_allocated'] or 0) if budget else 0.0
-            project['total_burnt'] = float(budget['total_burnt'] or 0) if budget else 0.0
-            project['total_remaining'] = float(budget['total_remaining'] or 0) if budget else 0.0
-            
-            # Calculate variance
-            if project['total_allocated'] > 0:
-                project['budget_variance'] = ((project['total_burnt'] - project['total_allocated']) / project['total_allocated']) * 100
-            else:
-                project['budget_variance'] = 0
-            
-            # Status category
-            if project['status'] == 0:
-                project['status_category'] = 'completed'
-            elif project['end_date'] and project['end_date'] < today:
-                project['status_category'] = 'overdue'
-            else:
-                project['status_category'] = 'active'
-            
-            # Days overdue
-            if project['end_date'] and project['end_date'] < today and project['status'] != 0:
-                project['days_overdue'] = (today - project['end_date']).days
-            else:
-                project['days_overdue'] = 0
-
-        cursor.close()
-        return projects
-
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to fetch projects: {str(e)}")
-
-@router.get("/summary")
-async def get_projects_summary(
-    db: MySQLConnection = Depends(get_db),
+    """Get projects with budget info
+
+    Without `limit` the full list is returned; with it, a page of
+    `{"items": [...], "next_cursor": ...}` ordered by `sort`.
+    """
+    if status_category is not None and status_category not in STATUS_CATEGORIES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid status_category. Valid: {', '.join(STATUS_CATEGORIES)}")
+    if sort is not None and sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid sort. Valid: {', '.join(SORT_COLUMNS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid order. Valid: asc, desc")
+    if cursor is not None and limit is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="cursor requires limit")
+
+    params = ProjectListParams(
+        status_filter=status_filter,
+        status_category=status_category,
+        client_id=client_id,
+        project_manager=project_manager,
+        date_from=date_from,
+        date_to=date_to,
+        sort=sort,
+        order=order,
+        limit=limit,
+        cursor=cursor,
+        fields=_parse_fields(fields)
+    )
+    if cursor is not None:
+        _decode_cursor(cursor, params)
+
+    return await _conditional_query(request, ("projects", params), "Failed to fetch projects", _load_projects, params, layout=layout)
+
+@router.get("/dashboard")
+async def get_dashboard(
+    request: Request,
+    sections: Optional[str] = Query(None, description="Comma-separated sections: summary,projects,leaderboard,timeline,risks"),
+    layout: str = Depends(get_layout),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get project summary stats"""
-    try:
-        cursor = get_db_cursor(db)
-        if not cursor:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="DB error.")
-        
-        today = date.today()
-
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN status = 0 THEN 1 ELSE 0 END) as completed,
-                SUM(CASE WHEN status != 0 AND end_date < %s THEN 1 ELSE 0 END) as overdue,
-                SUM(CASE WHEN status != 0 AND (end_date >= %s OR end_date IS NULL) THEN 1 ELSE 0 END) as active
-            FROM projects
-        """, (today, today))
-        summary = cursor.fetchone()
-
-        cursor.execute("""
-            SELECT 
-                COALESCE(SUM(allocated_amount), 0) as total_allocated,
-                COALESCE(SUM(burnt_amount), 0) as total_burnt,
-                COALESCE(SUM(remaining_amount), 0) as total_remaining
-            FROM budgets
-        """)
-        budget = cursor.fetchone()
-
-        cursor.close()
-        return {
-            'total_projects': summary['total'],
-            'active_projects': summary['active'],
-            'overdue_projects': summary['overdue'],
-            'completed_projects': summary['completed'],
-            'total_budget_allocated': float(budget['total_allocated']),
-            'total_budget_burnt': float(budget['total_burnt']),
-            'total_budget_remaining': float(budget['total_remaining'])
-        }
+    """Get all dashboard sections from one data load"""
+    selected = _parse_sections(sections)
+    return await _conditional_query(request, ("dashboard", selected), "Failed to fetch dashboard", _load_dashboard, selected, layout=layout)
 
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to fetch summary: {str(e)}")
+@router.get("/summary")
+async def get_projects_summary(request: Request, current_user: dict = Depends(get_current_user)):
+    """Get project summary stats"""
+    return await _conditional_query(request, ("summary",), "Failed to fetch summary", _load_summary)
 
 @router.get("/{project_id}/budget")
 async def get_project_budget(
     project_id: int,
-    db: MySQLConnection = Depends(get_db),
+    layout: str = Depends(get_layout),
     current_user: dict = Depends(get_current_user)
 ):
     """Get budget details for a project"""
-    try:
-        cursor = get_db_cursor(db)
-        if not cursor:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="DB error.")
-
-        cursor.execute("""
-            SELECT budget_id, budget_name, budget_type, allocated_amount,
-                   burnt_amount, remaining_amount, status
-            FROM budgets WHERE project_id = %s
-        """, (project_id,))
-
-        budgets = cursor.fetchall()
-        for budget in budgets:
-            budget['allocated_amount'] = float(budget['allocated_amount'] or 0)
-            budget['burnt_amount'] = float(budget['burnt_amount'] or 0)
-            budget['remaining_amount'] = float(budget['remaining_amount'] or 0)
-
-        cursor.close()
-        return budgets
-
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to fetch budget: {str(e)}")
+    budgets = await _query("Failed to fetch budget", _load_project_budget, project_id)
+    return FastJSONResponse(content=apply_layout(budgets, layout))
 
 @router.get("/manager-leaderboard")
 async def get_manager_leaderboard(
-    db: MySQLConnection = Depends(get_db),
+    request: Request,
+    layout: str = Depends(get_layout),
     current_user: dict = Depends(get_current_user)
 ):
     """Get PM leaderboard"""
-    try:
-        cursor = get_db_cursor(db)
-        if not cursor:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="DB error.")
-        
-        today = date.today()
-
-        cursor.execute("""
-            SELECT 
-                p.project_manager,
-                CONCAT(e.first_name, ' ', e.last_name) as manager_name,
-                COUNT(DISTINCT p.project_id) as total_projects,
-                COUNT(DISTINCT CASE WHEN p.status = 0 THEN p.project_id END) as completed_projects,
-                COUNT(DISTINCT CASE WHEN p.status != 0 AND p.end_date < %s THEN p.project_id END) as overdue_projects,
-                COUNT(DISTINCT CASE WHEN p.status != 0 AND (p.end_date >= %s OR p.end_date IS NULL) THEN p.project_id END) as active_projects,
-                COALESCE(SUM(b.allocated_amount), 0) as total_budget_managed,
-                COALESCE(SUM(b.burnt_amount), 0) as total_burnt,
-                AVG(CASE 
-                    WHEN b.allocated_amount > 0 
-                    THEN ((b.burnt_amount - b.allocated_amount) / b.allocated_amount) * 100 
-                    ELSE 0 
-                END) as avg_budget_variance
-            FROM projects p
-            LEFT JOIN employees e ON p.project_manager = e.employee_id
-            LEFT JOIN budgets b ON p.project_id = b.project_id
-            WHERE p.project_manager IS NOT NULL
-            GROUP BY p.project_manager, e.first_name, e.last_name
-            ORDER BY completed_projects DESC, total_projects DESC
-        """, (today, today))
-
-        leaderboard = cursor.fetchall()
-        for manager in leaderboard:
-            manager['total_budget_managed'] = float(manager['total_budget_managed'] or 0)
-            manager['total_burnt'] = float(manager['total_burnt'] or 0)
-            manager['avg_budget_variance'] = float(manager['avg_budget_variance'] or 0)
-
-        cursor.close()
-        return leaderboard
-
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to fetch leaderboard: {str(e)}")
+    return await _conditional_query(request, ("manager-leaderboard",), "Failed to fetch leaderboard", _load_manager_leaderboard, layout=layout)
 
 @router.get("/timeline")
 async def get_projects_timeline(
-    db: MySQLConnection = Depends(get_db),
+    request: Request,
+    date_from: Optional[date] = Query(None, alias="from", description="Viewport start: only projects running on or after this date"),
+    date_to: Optional[date] = Query(None, alias="to", description="Viewport end: only projects running on or before this date"),
+    layout: str = Depends(get_layout),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get project timeline for Gantt chart"""
-    try:
-        cursor = get_db_cursor(db)
-        if not cursor:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="DB error.")
-
-        cursor.execute("""
-            SELECT 
-                p.project_id, p.project_name, c.client_name,
-                CONCAT(e.first_name, ' ', e.last_name) as manager_name,
-                p.start_date, p.end_date, p.status,
-                COALESCE(SUM(b.allocated_amount), 0) as budget_allocated,
-                COALESCE(SUM(b.burnt_amount), 0) as budget_burnt
-            FROM projects p
-            LEFT JOIN clients c ON p.client_id = c.client_id
-            LEFT JOIN employees e ON p.project_manager = e.employee_id
-            LEFT JOIN budgets b ON p.project_id = b.project_id
-            GROUP BY p.project_id, p.project_name, c.client_name, e.first_name, e.last_name, 
-                     p.start_date, p.end_date, p.status
-            ORDER BY p.start_date
-        """)
-
-        projects = cursor.fetchall()
-        timeline = []
-        for p in projects:
-            timeline.append({
-                'id': p['project_id'],
-                'name': p['project_name'],
-                'client': p['client_name'] or 'N/A',
-                'manager': p['manager_name'] or 'N/A',
-                'start': p['start_date'].isoformat() if p['start_date'] else None,
-                'end': p['end_date'].isoformat() if p['end_date'] else None,
-                'status': 'completed' if p['status'] == 0 else 'active',
-                'budget_allocated': float(p['budget_allocated']),
-                'budget_burnt': float(p['budget_burnt'])
-            })
-
-        cursor.close()
-        return timeline
-
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to fetch timeline: {str(e)}")
+    """Get project timeline for Gantt chart
+
+    With `from`/`to` only projects overlapping the viewport are returned,
+    answered from an in-memory interval index instead of a new query.
+    """
+    if date_from is None and date_to is None:
+        return await _conditional_query(request, ("timeline",), "Failed to fetch timeline", _load_timeline, layout=layout)
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="from must not be after to")
+
+    version = await _data_version()
+    etag = make_etag(version, ("timeline", date_from, date_to, layout))
+    if etag_matches(request, etag):
+        return not_modified(request, etag)
+
+    async def render():
+        index = await _timeline_index(version)
+        return render_json(apply_layout(index.overlapping(date_from, date_to), layout))
+    return await encoded_response(request, "timeline", etag, render)
 
 @router.get("/risks")
 async def get_project_risks(
-    db: MySQLConnection = Depends(get_db),
+    request: Request,
+    layout: str = Depends(get_layout),
     current_user: dict = Depends(get_current_user)
 ):
     """Get projects with risk alerts"""
-    try:
-        cursor = get_db_cursor(db)
-        if not cursor:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="DB error.")
-        
-        today = date.today()
-
-        cursor.execute("""
-            SELECT 
-                p.project_id, p.project_name, c.client_name,
-                CONCAT(e.first_name, ' ', e.last_name) as manager_name,
-                p.start_date, p.end_date, p.status,
-                COALESCE(SUM(b.allocated_amount), 0) as allocated_amount,
-                COALESCE(SUM(b.burnt_amount), 0) as burnt_amount,
-                CASE 
-                    WHEN p.end_date < %s AND p.status != 0 THEN (DATEDIFF(%s, p.end_date))
-                    ELSE 0
-                END as days_overdue,
-                CASE 
-                    WHEN COALESCE(SUM(b.allocated_amount), 0) > 0 
-                    THEN ((COALESCE(SUM(b.burnt_amount), 0) - COALESCE(SUM(b.allocated_amount), 0)) / COALESCE(SUM(b.allocated_amount), 0)) * 100
-                    ELSE 0
-                END as budget_variance_pct
-            FROM projects p
-            LEFT JOIN clients c ON p.client_id = c.client_id
-            LEFT JOIN employees e ON p.project_manager = e.employee_id
-            LEFT JOIN budgets b ON p.project_id = b.project_id
-            GROUP BY p.project_id, p.project_name, c.client_name, e.first_name, e.last_name, 
-                     p.start_date, p.end_date, p.status
-            HAVING (days_overdue > 0) OR (budget_variance_pct > 10)
-            ORDER BY days_overdue DESC, budget_variance_pct DESC
-        """, (today, today))
-
-        risks = cursor.fetchall()
-        alerts = []
-        for risk in risks:
-            messages = []
-            if risk['days_overdue'] > 0:
-                messages.append(f"Project is {risk['days_overdue']} days overdue")
-            if risk['budget_variance_pct'] > 10:
-                messages.append(f"Project is {risk['budget_variance_pct']:.1f}% over budget")
-
-            alerts.append({
-                'project_id': risk['project_id'],
-                'project_name': risk['project_name'],
-                'client_name': risk['client_name'] or 'N/A',
-                'manager_name': risk['manager_name'] or 'N/A',
-                'days_overdue': risk['days_overdue'],
-                'budget_variance_pct': float(risk['budget_variance_pct']),
-                'allocated_amount': float(risk['allocated_amount']),
-                'burnt_amount': float(risk['burnt_amount']),
-                'alerts': messages,
-                'risk_level': 'high' if risk['days_overdue'] > 7 or risk['budget_variance_pct'] > 20 else 'medium'
-            })
-
-        cursor.close()
-        return alerts
-
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to fetch risks: {str(e)}")
+    return await _conditional_query(request, ("risks",), "Failed to fetch risks", _load_risks, layout=layout)
+
+@router.get("/risk-scores")
+async def get_project_risk_scores(
+    request: Request,
+    variance_pct: float = Query(DEFAULT_RISK_RULES.variance_pct, description="Over-budget alert above this variance %"),
+    overdue_days: int = Query(DEFAULT_RISK_RULES.overdue_days, ge=0, description="Overdue alert above this many days late"),
+    high_variance_pct: float = Query(DEFAULT_RISK_RULES.high_variance_pct, description="High risk above this variance %"),
+    high_overdue_days: int = Query(DEFAULT_RISK_RULES.high_overdue_days, ge=0, description="High risk above this many days late"),
+    overdue_weight: float = Query(DEFAULT_RISK_RULES.overdue_weight, ge=0, description="risk_score weight of days overdue"),
+    variance_weight: float = Query(DEFAULT_RISK_RULES.variance_weight, ge=0, description="risk_score weight of budget variance"),
+    order_by: str = Query("overdue", description="Sort: overdue (like /risks) or score"),
+    layout: str = Depends(get_layout),
+    current_user: dict = Depends(get_current_user)
+):
+    """Score project risks under caller-supplied thresholds and weights
+
+    Every scenario is scored against the same cached columnar snapshot of
+    the portfolio, so what-if queries never go back to the database.
+    """
+    if order_by not in RISK_ORDERS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid order_by. Valid: {', '.join(RISK_ORDERS)}")
+    rules = RiskRules(variance_pct, overdue_days, high_variance_pct, high_overdue_days, overdue_weight, variance_weight)
+
+    version = await _data_version()
+    etag = make_etag(version, ("risk-scores", tuple(rules), order_by, layout))
+    if etag_matches(request, etag):
+        return not_modified(request, etag)
+
+    async def render():
+        frame = await _cached_query(("risk-frame", version), "Failed to load risk data", _load_risk_frame)
+        scores = await run_in_threadpool(score_risks, frame, date.today(), rules, order_by)
+        return render_json(apply_layout(scores, layout))
+    return await encoded_response(request, "risk-scores", etag, render)
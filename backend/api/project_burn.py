@@ -0,0 +1,46 @@
+"""
+Budget burn trend and forecast endpoints, served from the burn history files (never the budgets table)
+"""
+from datetime import date, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from api.dependencies import get_current_user
+from api.responses import make_etag, etag_matches, not_modified, render_json, encoded_response
+from core.burn_history import burn_history
+
+router = APIRouter(prefix="/api/projects", tags=["Projects"])
+
+MAX_FORECAST_WINDOW = 365
+
+@router.get("/burn-forecast")
+async def get_burn_forecast(
+    request: Request,
+    window_days: int = Query(30, ge=1, le=MAX_FORECAST_WINDOW, description="Days of history the burn rate is fitted over"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Portfolio burn rate and projects projected to overrun their budget by their end date"""
+    etag = make_etag(burn_history.version(), ("burn-forecast", window_days))
+    if etag_matches(request, etag):
+        return not_modified(request, etag)
+
+    async def render():
+        return render_json(await run_in_threadpool(burn_history.forecast, window_days))
+    return await encoded_response(request, "burn-forecast", etag, render)
+
+@router.get("/{project_id}/burn-trend")
+async def get_burn_trend(
+    project_id: int,
+    request: Request,
+    days: Optional[int] = Query(None, ge=1, description="Only the last N days (default: all history)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Captured allocated/burnt totals over time for a project and each of its budgets"""
+    etag = make_etag(burn_history.version(), ("burn-trend", project_id, days))
+    if etag_matches(request, etag):
+        return not_modified(request, etag)
+    since = date.today() - timedelta(days=days) if days is not None else None
+
+    async def render():
+        return render_json(await run_in_threadpool(burn_history.project_trend, project_id, since))
+    return await encoded_response(request, "burn-trend", etag, render)
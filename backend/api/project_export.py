@@ -0,0 +1,153 @@
+"""
+Streaming project + budget exports (NDJSON, CSV, Arrow IPC, Parquet)
+"""
+import asyncio
+import csv
+import io
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from api.dependencies import get_current_user
+from api.responses import json_default, retry_after_headers
+from core.config import settings
+from core.admission import EXPORT, Saturated, limiters
+from core.analytics import EXPORT_COLUMNS, EXPORT_QUERY
+from core.arrow_export import (
+    ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE, arrow_available, record_batches,
+    arrow_stream_chunks, parquet_chunks
+)
+from core.database import acquire_connection, release_connection, iter_batches, db_breaker
+
+router = APIRouter(prefix="/api/projects", tags=["Projects"])
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": ARROW_STREAM_MEDIA_TYPE,
+    "parquet": PARQUET_MEDIA_TYPE
+}
+
+# Formats built from Arrow record batches (need pyarrow)
+COLUMNAR_FORMATS = {"arrow", "parquet"}
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _ndjson_chunks(batches):
+    # Rows already have exactly EXPORT_COLUMNS, in order (EXPORT_QUERY's select list)
+    for rows in batches:
+        yield b"".join(
+            orjson.dumps(row, default=json_default, option=orjson.OPT_APPEND_NEWLINE) for row in rows
+        )
+
+def _csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(row[k]) for k in EXPORT_COLUMNS] for row in rows)
+        yield buffer.getvalue()
+
+def _chunks(conn, fmt: str):
+    if fmt == "arrow":
+        return arrow_stream_chunks(record_batches(conn, settings.EXPORT_ARROW_BATCH_SIZE))
+    if fmt == "parquet":
+        batches = record_batches(conn, settings.EXPORT_ARROW_BATCH_SIZE)
+        return parquet_chunks(batches, settings.EXPORT_PARQUET_ROW_GROUP_ROWS)
+    batches = iter_batches(conn, EXPORT_QUERY, batch_size=settings.EXPORT_BATCH_SIZE, label="export")
+    return _csv_chunks(batches) if fmt == "csv" else _ndjson_chunks(batches)
+
+class _SlotRelease:
+    """Returns an admission slot exactly once, on the event loop
+
+    The export body is iterated in a worker thread, while the limiter may
+    only be touched from the loop.
+    """
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._loop = asyncio.get_running_loop()
+        self._lock = threading.Lock()
+        self._released = False
+
+    def __call__(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        try:
+            self._loop.call_soon_threadsafe(self._limiter.release)
+        except RuntimeError:
+            # The loop is already closed (shutdown); the slot no longer matters
+            pass
+
+def _stream(conn, fmt: str, release_slot):
+    """Yield encoded chunks batch by batch, returning the connection and export slot when done or failed"""
+    try:
+        chunks = _chunks(conn, fmt)
+        for chunk in chunks:
+            yield chunk
+    finally:
+        release_connection(conn)
+        release_slot()
+
+@router.get("/export")
+async def export_projects(
+    fmt: str = Query("ndjson", alias="format", description="ndjson, csv, arrow or parquet"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream every project with its budgets, one row per budget"""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format. Valid: {', '.join(EXPORT_FORMATS)}"
+        )
+    if fmt in COLUMNAR_FORMATS and not arrow_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"The {fmt} format requires pyarrow on the server."
+        )
+
+    # The export slot is held until the download finishes, not just until the response starts
+    limiter = limiters[EXPORT]
+    try:
+        await limiter.acquire()
+    except Saturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many exports in progress.",
+            headers=retry_after_headers(e.retry_after)
+        )
+
+    try:
+        conn = await run_in_threadpool(acquire_connection, True, limiter.timeout_ms)
+    except BaseException:
+        # Including cancellation: a failed checkout must not keep the slot
+        limiter.release()
+        raise
+    if not conn:
+        limiter.release()
+        retry_after = db_breaker.retry_after() if db_breaker.is_open else settings.ADMISSION_RETRY_AFTER
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable.",
+            headers=retry_after_headers(retry_after)
+        )
+
+    filename = f"projects_budgets_{date.today().strftime('%Y%m%d')}.{fmt}"
+    return StreamingResponse(
+        _stream(conn, fmt, _SlotRelease(limiter)),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,68 @@
+"""
+Live dashboard updates over Server-Sent Events
+"""
+import asyncio
+from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from api.auth import TokenResponse
+from api.dependencies import get_current_user, get_stream_user
+from core.config import settings
+from core.live import dashboard_broadcaster
+from core.security import create_access_token
+
+router = APIRouter(prefix="/api/projects", tags=["Projects"])
+
+# How long a new subscriber waits for the first shared poll before getting an error event
+SNAPSHOT_TIMEOUT = 30.0
+
+def _sse(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+async def _events(request: Request):
+    """Full snapshot first, then only the sections that changed, with keepalive comments"""
+    # Subscribed only once the body is iterated: a response that is never sent
+    # (client gone before the first chunk) would otherwise never unsubscribe
+    queue = dashboard_broadcaster.subscribe()
+    try:
+        snapshot = await dashboard_broadcaster.snapshot(SNAPSHOT_TIMEOUT)
+        if snapshot is None:
+            yield _sse("unavailable", b'{"detail":"Dashboard data unavailable."}')
+            return
+        # Updates queued while waiting are already part of the snapshot
+        while not queue.empty():
+            queue.get_nowait()
+        yield b"retry: 5000\n" + _sse("snapshot", snapshot)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.LIVE_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield b": keepalive\n\n"
+                continue
+            yield _sse("update", event)
+    finally:
+        dashboard_broadcaster.unsubscribe(queue)
+
+@router.get("/stream")
+async def stream_dashboard(request: Request, current_user: dict = Depends(get_stream_user)):
+    """Push dashboard sections as they change (text/event-stream)"""
+    if not settings.LIVE_UPDATES_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Live updates are disabled.")
+
+    return StreamingResponse(
+        _events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/stream/token", response_model=TokenResponse)
+async def stream_token(current_user: dict = Depends(get_current_user)):
+    """Short-lived token that only opens /stream, for EventSource clients that must pass it in the URL"""
+    token = create_access_token(
+        data={"sub": "frontend_service", "type": "stream_token"},
+        expires_delta=timedelta(seconds=settings.STREAM_TOKEN_EXPIRE_SECONDS)
+    )
+    return TokenResponse(access_token=token, expires_in=settings.STREAM_TOKEN_EXPIRE_SECONDS)
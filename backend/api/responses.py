@@ -0,0 +1,127 @@
+"""
+HTTP helpers for conditional analytics responses
+"""
+import hashlib
+import math
+import time
+from datetime import date
+from decimal import Decimal
+import orjson
+from fastapi import Request, Response, status
+from fastapi.responses import ORJSONResponse
+from core.cache import encoded_cache
+from core.compression import choose_encoding, compress_async, encoded_etag, should_compress
+from core.config import settings
+from core.profiling import record as profile_phase
+from core.singleflight import encode_flight
+
+LAYOUTS = ("rows", "columns")
+
+def json_default(value):
+    """orjson fallback for values it does not encode natively (Decimal)"""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def render_json(content) -> bytes:
+    """orjson-encoded JSON; dates and datetimes are encoded natively as ISO strings"""
+    start = time.perf_counter()
+    try:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    finally:
+        profile_phase("serialization", time.perf_counter() - start)
+
+class FastJSONResponse(ORJSONResponse):
+    """JSON response rendered with render_json"""
+
+    def render(self, content) -> bytes:
+        return render_json(content)
+
+def _is_rows(value) -> bool:
+    return isinstance(value, list) and bool(value) and isinstance(value[0], dict)
+
+def to_columns(rows: list) -> dict:
+    """Column-oriented form of a list of dicts: each key is sent once with a list of values"""
+    names = list(rows[0]) if rows else []
+    return {
+        "count": len(rows),
+        "columns": {name: [row[name] for row in rows] for name in names}
+    }
+
+def apply_layout(value, layout: str):
+    """Convert row lists (top level or one level down, e.g. items/sections) to the requested layout"""
+    if layout != "columns":
+        return value
+    if isinstance(value, list):
+        return to_columns(value)
+    if isinstance(value, dict):
+        return {k: to_columns(v) if _is_rows(v) or v == [] else v for k, v in value.items()}
+    return value
+
+def make_etag(version: str, key: tuple) -> str:
+    """Strong ETag for an endpoint result at a given data version"""
+    # Status categories and overdue days depend on today's date as well as the data
+    raw = f"{version}|{date.today().isoformat()}|{key!r}"
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+
+def response_etag(request: Request, etag: str) -> str:
+    """ETag of the variant this request gets (identity, gzip or br) of the result tagged etag"""
+    return encoded_etag(etag, choose_encoding(request.headers.get("accept-encoding")))
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match covers the variant of etag it would be sent"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    etag = response_etag(request, etag)
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in candidates)
+
+def retry_after_headers(seconds: float) -> dict:
+    """Retry-After for a 503, in whole seconds (at least 1)"""
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+def not_modified(request: Request, etag: str) -> Response:
+    """Empty 304 response carrying the current validator of the request's variant"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(response_etag(request, etag)))
+
+def cache_headers(etag: str) -> dict:
+    """Validator headers; clients must revalidate before reusing a stored copy"""
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+
+async def _encode(key: tuple, render, encoding) -> tuple:
+    body = await render()
+    applied = None
+    if encoding is not None and should_compress(body, "application/json"):
+        body = await compress_async(body, encoding)
+        applied = encoding
+    entry = (body, applied)
+    if settings.ANALYTICS_CACHE_ENABLED:
+        encoded_cache.set(key, entry)
+    return entry
+
+async def encoded_response(request: Request, endpoint: str, etag: str, render) -> Response:
+    """JSON response for etag, reusing the encoded and compressed body across requests
+
+    render is an async callable returning the JSON bytes; it only runs when
+    no body is cached for this endpoint, ETag and negotiated encoding (bodies
+    are only cached with ANALYTICS_CACHE_ENABLED). The ETag sent is specific
+    to the negotiated encoding.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    key = (endpoint, etag, encoding)
+    hit, entry = encoded_cache.get(key) if settings.ANALYTICS_CACHE_ENABLED else (False, None)
+    if not hit:
+        if settings.QUERY_COALESCING_ENABLED:
+            # A burst of identical misses encodes and compresses once
+            entry = await encode_flight.do(key, endpoint, _encode, key, render, encoding)
+        else:
+            entry = await _encode(key, render, encoding)
+
+    body, applied = entry
+    headers = cache_headers(encoded_etag(etag, encoding))
+    if applied is not None:
+        headers["Content-Encoding"] = applied
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,72 @@
+"""
+Operational status endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from api.dependencies import get_current_user
+from core.cache import analytics_cache, encoded_cache
+from core.database import DatabaseUnavailable, db_breaker, pool_stats, replica_stats, run_db
+from core.admission import admission_stats
+from core.rollup import budget_rollup
+from core.live import dashboard_broadcaster
+from core.security import token_cache
+from core.snapshot import snapshot_stats
+from core.singleflight import query_flight, encode_flight
+from core.burn_history import burn_history
+from core.profiling import profile_store
+
+router = APIRouter(prefix="/api/system", tags=["System"])
+
+@router.get("/status")
+async def get_status(current_user: dict = Depends(get_current_user)):
+    """Runtime stats for the DB pool, caches, budget rollup and live stream"""
+    return {
+        "db_pool": pool_stats(),
+        "db_replicas": replica_stats(),
+        "db_breaker": db_breaker.stats(),
+        "admission": admission_stats(),
+        "analytics_cache": analytics_cache.stats(),
+        "encoded_cache": encoded_cache.stats(),
+        "query_coalescing": {"queries": query_flight.stats(), "encoded_bodies": encode_flight.stats()},
+        "budget_rollup": budget_rollup.stats(),
+        "live_updates": dashboard_broadcaster.stats(),
+        "token_cache": token_cache.stats(),
+        "snapshot": snapshot_stats(),
+        "burn_history": burn_history.stats()
+    }
+
+@router.post("/cache/invalidate")
+async def invalidate_cache(
+    endpoint: Optional[str] = Query(None, description="Only drop entries for this endpoint (e.g. summary, risks)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Drop cached analytics results and their encoded bodies"""
+    encoded_cache.invalidate(endpoint)
+    return {"invalidated": analytics_cache.invalidate(endpoint)}
+
+@router.post("/rollup/rebuild")
+async def rebuild_rollup(current_user: dict = Depends(get_current_user)):
+    """Recompute the per-project budget rollup from a full scan of budgets"""
+    try:
+        await run_db(budget_rollup.rebuild, read_only=True)
+    except DatabaseUnavailable:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable.")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to rebuild rollup: {str(e)}")
+    analytics_cache.invalidate()
+    encoded_cache.invalidate()
+    return budget_rollup.stats()
+
+@router.get("/profiles")
+async def list_profiles(current_user: dict = Depends(get_current_user)):
+    """Recent on-demand request profiles and the slowest sampled ones kept on disk"""
+    return await run_in_threadpool(profile_store.stats)
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, current_user: dict = Depends(get_current_user)):
+    """One request profile: phase breakdown, top functions and collapsed stacks"""
+    profile = await run_in_threadpool(profile_store.get, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found.")
+    return profile
@@ -0,0 +1,132 @@
+"""
+Admission control: per-endpoint-class limits on concurrent DB work, with bounded wait queues
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from core.config import settings
+from core.database import statement_timeout_ms
+from core.metrics import admission_requests
+from core.profiling import record as profile_phase
+
+LIGHT = "light"     # single-row/aggregate lookups (summary, project budget, version probe)
+HEAVY = "heavy"     # full dataset loads (dashboard, lists, leaderboard, timeline, risks)
+EXPORT = "export"   # streaming exports, which hold a connection for the whole download
+
+class Saturated(Exception):
+    """The class's slots and wait queue are full, or the wait timed out"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Too many concurrent {name} requests")
+        self.retry_after = retry_after
+
+class AdmissionLimiter:
+    """At most `concurrency` holders at once; up to `queue_size` more wait (FIFO) for `queue_timeout`
+
+    Runs on the event loop only. Holders run their DB work with this class's
+    statement timeout.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float, timeout_ms: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self.timeout_ms = timeout_ms
+        self._active = 0
+        self._waiters: deque = deque()
+        self._admitted = 0
+        self._queued = 0
+        self._rejected = 0
+        self._timeouts = 0
+
+    async def acquire(self):
+        """Take a slot, waiting in the queue if needed; raises Saturated"""
+        if not settings.ADMISSION_ENABLED:
+            return
+        if self._active < self.concurrency and not self._waiters:
+            self._active += 1
+            self._admitted += 1
+            admission_requests.inc((self.name, "admitted"))
+            return
+        if len(self._waiters) >= self.queue_size:
+            self._rejected += 1
+            admission_requests.inc((self.name, "rejected"))
+            raise Saturated(self.name, settings.ADMISSION_RETRY_AFTER)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._queued += 1
+        admission_requests.inc((self.name, "queued"))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # wait_for (3.12+) can time out on a future release() completed in the same tick
+                self.release()
+            self._timeouts += 1
+            admission_requests.inc((self.name, "timed_out"))
+            raise Saturated(self.name, settings.ADMISSION_RETRY_AFTER) from None
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the caller went away; pass it on
+                self.release()
+            raise
+        finally:
+            profile_phase("admission_wait", time.perf_counter() - start)
+            try:
+                self._waiters.remove(future)
+            except ValueError:
+                pass
+        self._admitted += 1
+        admission_requests.inc((self.name, "admitted"))
+
+    def release(self):
+        """Give the slot to the oldest waiter, or free it"""
+        if not settings.ADMISSION_ENABLED:
+            return
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot, with this class's statement timeout applied to connections checked out inside"""
+        await self.acquire()
+        token = statement_timeout_ms.set(self.timeout_ms)
+        try:
+            yield
+        finally:
+            statement_timeout_ms.reset(token)
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "queue_size": self.queue_size,
+            "statement_timeout_ms": self.timeout_ms,
+            "admitted": self._admitted,
+            "queued": self._queued,
+            "rejected": self._rejected,
+            "timeouts": self._timeouts
+        }
+
+limiters = {
+    LIGHT: AdmissionLimiter(LIGHT, settings.ADMISSION_LIGHT_CONCURRENCY, settings.ADMISSION_QUEUE_SIZE,
+                            settings.ADMISSION_QUEUE_TIMEOUT, settings.LIGHT_STATEMENT_TIMEOUT_MS),
+    HEAVY: AdmissionLimiter(HEAVY, settings.ADMISSION_HEAVY_CONCURRENCY, settings.ADMISSION_QUEUE_SIZE,
+                            settings.ADMISSION_QUEUE_TIMEOUT, settings.HEAVY_STATEMENT_TIMEOUT_MS),
+    EXPORT: AdmissionLimiter(EXPORT, settings.ADMISSION_EXPORT_CONCURRENCY, settings.ADMISSION_QUEUE_SIZE,
+                             settings.ADMISSION_QUEUE_TIMEOUT, settings.EXPORT_STATEMENT_TIMEOUT_MS)
+}
+
+def admission_stats() -> dict:
+    """Per-class limiter state for the status endpoint"""
+    return {"enabled": settings.ADMISSION_ENABLED, **{name: limiter.stats() for name, limiter in limiters.items()}}
@@ -0,0 +1,313 @@
+"""
+Shared project dataset and the analytics views built from it
+"""
+from datetime import date
+from typing import Dict, List, Optional
+from core.config import settings
+from core.database import fetch_all, fetch_one
+from core.rollup import budget_rollup
+
+SECTIONS = ("summary", "projects", "leaderboard", "timeline", "risks")
+
+PROJECTS_QUERY = """
+    SELECT
+        p.project_id, p.project_name, p.client_id, c.client_name,
+        p.project_manager, CONCAT(e.first_name, ' ', e.last_name) as manager_name,
+        p.start_date, p.end_date, p.status, p.created_at, p.updated_at
+    FROM projects p
+    LEFT JOIN clients c ON p.client_id = c.client_id
+    LEFT JOIN employees e ON p.project_manager = e.employee_id
+"""
+
+BUDGET_TOTALS_QUERY = """
+    SELECT
+        project_id,
+        COALESCE(SUM(allocated_amount), 0) as total_allocated,
+        COALESCE(SUM(burnt_amount), 0) as total_burnt,
+        COALESCE(SUM(remaining_amount), 0) as total_remaining,
+        COALESCE(SUM(CASE
+            WHEN allocated_amount > 0
+            THEN ((burnt_amount - allocated_amount) / allocated_amount) * 100
+            ELSE 0
+        END), 0) as variance_sum,
+        COUNT(*) as budget_rows
+    FROM budgets
+    GROUP BY project_id
+"""
+
+EXPORT_COLUMNS = (
+    "project_id", "project_name", "client_id", "client_name", "project_manager", "manager_name",
+    "start_date", "end_date", "project_status",
+    "budget_id", "budget_name", "budget_type", "allocated_amount", "burnt_amount",
+    "remaining_amount", "budget_status"
+)
+
+# One row per budget (or one row with empty budget columns for projects without budgets).
+# No ORDER BY: a sort would make MySQL materialise the whole join before the first row.
+EXPORT_QUERY = """
+    SELECT
+        p.project_id, p.project_name, p.client_id, c.client_name,
+        p.project_manager, CONCAT(e.first_name, ' ', e.last_name) as manager_name,
+        p.start_date, p.end_date, p.status as project_status,
+        b.budget_id, b.budget_name, b.budget_type, b.allocated_amount, b.burnt_amount,
+        b.remaining_amount, b.status as budget_status
+    FROM projects p
+    LEFT JOIN clients c ON p.client_id = c.client_id
+    LEFT JOIN employees e ON p.project_manager = e.employee_id
+    LEFT JOIN budgets b ON p.project_id = b.project_id
+"""
+
+DATA_VERSION_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM projects) as project_count,
+        (SELECT MAX(updated_at) FROM projects) as projects_updated_at,
+        (SELECT COUNT(*) FROM budgets) as budget_count,
+        (SELECT MAX(updated_at) FROM budgets) as budgets_updated_at
+"""
+
+_NO_BUDGET = {
+    'total_allocated': 0.0,
+    'total_burnt': 0.0,
+    'total_remaining': 0.0,
+    'variance_sum': 0.0,
+    'budget_rows': 0
+}
+
+def load_budget_totals(conn, project_ids: Optional[List[int]] = None) -> Dict[int, dict]:
+    """Per-project budget totals keyed by project_id (includes budgets of unknown projects)
+
+    With project_ids, only those projects are aggregated in one batched lookup.
+    """
+    if project_ids is None:
+        rows = fetch_all(conn, BUDGET_TOTALS_QUERY, label="budget_totals")
+    elif not project_ids:
+        rows = []
+    else:
+        placeholders = ", ".join(["%s"] * len(project_ids))
+        query = BUDGET_TOTALS_QUERY.replace(
+            "FROM budgets", f"FROM budgets WHERE project_id IN ({placeholders})"
+        )
+        rows = fetch_all(conn, query, tuple(project_ids), label="budget_totals")
+
+    totals = {}
+    for row in rows:
+        totals[row['project_id']] = {
+            'total_allocated': float(row['total_allocated'] or 0),
+            'total_burnt': float(row['total_burnt'] or 0),
+            'total_remaining': float(row['total_remaining'] or 0),
+            'variance_sum': float(row['variance_sum'] or 0),
+            'budget_rows': int(row['budget_rows'] or 0)
+        }
+    return totals
+
+def budget_totals(conn, project_ids: Optional[List[int]] = None) -> Dict[int, dict]:
+    """Per-project budget totals from the in-process rollup, or straight from SQL when it is off"""
+    if not settings.ROLLUP_ENABLED:
+        return load_budget_totals(conn, project_ids)
+    if not budget_rollup.ready and not budget_rollup.rebuild(conn, wait=False):
+        # Another request is building the rollup; answer from SQL rather than wait for it
+        return load_budget_totals(conn, project_ids)
+    # Applies only rows changed since the last refresh, so reads stay current; concurrent
+    # reads refresh in parallel and never wait on each other's queries
+    budget_rollup.refresh(conn)
+    # Deltas cannot see deletes; the data version (and so the ETag and cache key) already
+    # counts them, so answer from a rebuilt rollup or SQL rather than stale sums
+    if budget_rollup.count_mismatch() and not budget_rollup.rebuild(conn, wait=False):
+        return load_budget_totals(conn, project_ids)
+    return budget_rollup.totals(project_ids)
+
+def load_data_version(conn) -> str:
+    """Cheap fingerprint of projects/budgets that changes whenever their rows do"""
+    row = fetch_one(conn, DATA_VERSION_QUERY, label="data_version")
+    if settings.ROLLUP_ENABLED:
+        budget_rollup.observe_budget_count(int(row['budget_count']))
+    return "|".join(str(row[k]) for k in (
+        'project_count', 'projects_updated_at', 'budget_count', 'budgets_updated_at'
+    ))
+
+def load_dataset(conn) -> dict:
+    """Load projects (with client/manager names) and budget totals in two queries"""
+    return {
+        'projects': fetch_all(conn, PROJECTS_QUERY, label="dataset_projects"),
+        'budgets': budget_totals(conn)
+    }
+
+def _is_open(project: dict) -> bool:
+    # Mirrors SQL `status != 0`, which is false for NULL status
+    return project['status'] is not None and project['status'] != 0
+
+def _is_overdue(project: dict, today: date) -> bool:
+    return _is_open(project) and project['end_date'] is not None and project['end_date'] < today
+
+def _variance(allocated: float, burnt: float) -> float:
+    if allocated > 0:
+        return ((burnt - allocated) / allocated) * 100
+    return 0
+
+def project_row(p: dict, totals: Optional[dict], today: date) -> dict:
+    """One GET /api/projects item: the project row plus budget totals and derived status"""
+    totals = totals or _NO_BUDGET
+    project = dict(p)
+    project['total_allocated'] = totals['total_allocated']
+    project['total_burnt'] = totals['total_burnt']
+    project['total_remaining'] = totals['total_remaining']
+    project['budget_variance'] = _variance(project['total_allocated'], project['total_burnt'])
+
+    if project['status'] == 0:
+        project['status_category'] = 'completed'
+    elif project['end_date'] and project['end_date'] < today:
+        project['status_category'] = 'overdue'
+    else:
+        project['status_category'] = 'active'
+
+    if project['end_date'] and project['end_date'] < today and project['status'] != 0:
+        project['days_overdue'] = (today - project['end_date']).days
+    else:
+        project['days_overdue'] = 0
+
+    return project
+
+def build_projects(dataset: dict, today: date, status_filter: Optional[int] = None) -> List[dict]:
+    """Project list with budget totals, same shape as GET /api/projects"""
+    budgets = dataset['budgets']
+    return [
+        project_row(p, budgets.get(p['project_id']), today)
+        for p in dataset['projects']
+        if status_filter is None or p['status'] == status_filter
+    ]
+
+def build_summary(dataset: dict, today: date) -> dict:
+    """Portfolio counts and budget totals, same shape as GET /api/projects/summary"""
+    projects = dataset['projects']
+    completed = overdue = active = 0
+    for p in projects:
+        if p['status'] == 0:
+            completed += 1
+        elif _is_overdue(p, today):
+            overdue += 1
+        elif _is_open(p):
+            active += 1
+
+    budgets = dataset['budgets'].values()
+    has_projects = bool(projects)
+    return {
+        'total_projects': len(projects),
+        'active_projects': active if has_projects else None,
+        'overdue_projects': overdue if has_projects else None,
+        'completed_projects': completed if has_projects else None,
+        'total_budget_allocated': sum(b['total_allocated'] for b in budgets),
+        'total_budget_burnt': sum(b['total_burnt'] for b in budgets),
+        'total_budget_remaining': sum(b['total_remaining'] for b in budgets)
+    }
+
+def build_leaderboard(dataset: dict, today: date) -> List[dict]:
+    """PM leaderboard, same shape as GET /api/projects/manager-leaderboard"""
+    budgets = dataset['budgets']
+    managers: Dict[int, dict] = {}
+    for p in dataset['projects']:
+        if p['project_manager'] is None:
+            continue
+        m = managers.get(p['project_manager'])
+        if m is None:
+            m = managers[p['project_manager']] = {
+                'project_manager': p['project_manager'],
+                'manager_name': p['manager_name'],
+                'total_projects': 0,
+                'completed_projects': 0,
+                'overdue_projects': 0,
+                'active_projects': 0,
+                'total_budget_managed': 0.0,
+                'total_burnt': 0.0,
+                'variance_sum': 0.0,
+                'variance_rows': 0
+            }
+        totals = budgets.get(p['project_id'], _NO_BUDGET)
+        m['total_projects'] += 1
+        if p['status'] == 0:
+            m['completed_projects'] += 1
+        elif _is_overdue(p, today):
+            m['overdue_projects'] += 1
+        elif _is_open(p):
+            m['active_projects'] += 1
+        m['total_budget_managed'] += totals['total_allocated']
+        m['total_burnt'] += totals['total_burnt']
+        # A project without budgets still contributes one zero-variance row to the SQL AVG
+        m['variance_sum'] += totals['variance_sum']
+        m['variance_rows'] += max(totals['budget_rows'], 1)
+
+    leaderboard = []
+    for m in managers.values():
+        variance_sum = m.pop('variance_sum')
+        variance_rows = m.pop('variance_rows')
+        m['avg_budget_variance'] = variance_sum / variance_rows if variance_rows else 0.0
+        leaderboard.append(m)
+
+    leaderboard.sort(key=lambda m: (m['completed_projects'], m['total_projects']), reverse=True)
+    return leaderboard
+
+def build_timeline(dataset: dict) -> List[dict]:
+    """Gantt rows ordered by start date, same shape as GET /api/projects/timeline"""
+    budgets = dataset['budgets']
+    projects = sorted(
+        dataset['projects'],
+        key=lambda p: (p['start_date'] is not None, p['start_date'] or date.min)
+    )
+    timeline = []
+    for p in projects:
+        totals = budgets.get(p['project_id'], _NO_BUDGET)
+        timeline.append({
+            'id': p['project_id'],
+            'name': p['project_name'],
+            'client': p['client_name'] or 'N/A',
+            'manager': p['manager_name'] or 'N/A',
+            'start': p['start_date'].isoformat() if p['start_date'] else None,
+            'end': p['end_date'].isoformat() if p['end_date'] else None,
+            'status': 'completed' if p['status'] == 0 else 'active',
+            'budget_allocated': totals['total_allocated'],
+            'budget_burnt': totals['total_burnt']
+        })
+    return timeline
+
+def build_risks(dataset: dict, today: date) -> List[dict]:
+    """Overdue / over-budget alerts, same shape as GET /api/projects/risks"""
+    budgets = dataset['budgets']
+    alerts = []
+    for p in dataset['projects']:
+        totals = budgets.get(p['project_id'], _NO_BUDGET)
+        days_overdue = (today - p['end_date']).days if _is_overdue(p, today) else 0
+        variance_pct = _variance(totals['total_allocated'], totals['total_burnt'])
+        if days_overdue <= 0 and variance_pct <= 10:
+            continue
+
+        messages = []
+        if days_overdue > 0:
+            messages.append(f"Project is {days_overdue} days overdue")
+        if variance_pct > 10:
+            messages.append(f"Project is {variance_pct:.1f}% over budget")
+
+        alerts.append({
+            'project_id': p['project_id'],
+            'project_name': p['project_name'],
+            'client_name': p['client_name'] or 'N/A',
+            'manager_name': p['manager_name'] or 'N/A',
+            'days_overdue': days_overdue,
+            'budget_variance_pct': float(variance_pct),
+            'allocated_amount': totals['total_allocated'],
+            'burnt_amount': totals['total_burnt'],
+            'alerts': messages,
+            'risk_level': 'high' if days_overdue > 7 or variance_pct > 20 else 'medium'
+        })
+
+    alerts.sort(key=lambda a: (a['days_overdue'], a['budget_variance_pct']), reverse=True)
+    return alerts
+
+def build_dashboard(dataset: dict, today: date, sections=SECTIONS) -> dict:
+    """Build the requested dashboard sections from one loaded dataset"""
+    builders = {
+        'summary': lambda: build_summary(dataset, today),
+        'projects': lambda: build_projects(dataset, today),
+        'leaderboard': lambda: build_leaderboard(dataset, today),
+        'timeline': lambda: build_timeline(dataset),
+        'risks': lambda: build_risks(dataset, today)
+    }
+    return {name: builders[name]() for name in SECTIONS if name in sections}
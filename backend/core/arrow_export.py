@@ -0,0 +1,137 @@
+"""
+Columnar (Arrow IPC / Parquet) encodings of the project + budget export
+"""
+from typing import Iterator
+from core.analytics import EXPORT_QUERY
+from core.database import iter_batches
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Arrow/Parquet exports are unavailable without pyarrow
+    pa = pq = None
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+PARQUET_COMPRESSION = "zstd"
+
+# Amount columns may come back as Decimal when DB_DECIMAL_AS_FLOAT is off
+_AMOUNT_COLUMNS = {"allocated_amount", "burnt_amount", "remaining_amount"}
+
+def arrow_available() -> bool:
+    return pa is not None
+
+def export_schema():
+    """Arrow schema of EXPORT_COLUMNS (budget columns are null for projects without budgets)"""
+    return pa.schema([
+        ("project_id", pa.int64()),
+        ("project_name", pa.string()),
+        ("client_id", pa.int64()),
+        ("client_name", pa.string()),
+        ("project_manager", pa.int64()),
+        ("manager_name", pa.string()),
+        ("start_date", pa.date32()),
+        ("end_date", pa.date32()),
+        ("project_status", pa.int32()),
+        ("budget_id", pa.int64()),
+        ("budget_name", pa.string()),
+        ("budget_type", pa.string()),
+        ("allocated_amount", pa.float64()),
+        ("burnt_amount", pa.float64()),
+        ("remaining_amount", pa.float64()),
+        ("budget_status", pa.int32())
+    ])
+
+def record_batches(conn, batch_size: int) -> Iterator:
+    """One RecordBatch per cursor batch of the export query"""
+    schema = export_schema()
+    for rows in iter_batches(conn, EXPORT_QUERY, batch_size=batch_size, label="export"):
+        columns = []
+        for field in schema:
+            values = [row[field.name] for row in rows]
+            if field.name in _AMOUNT_COLUMNS:
+                values = [float(v) if v is not None else None for v in values]
+            columns.append(pa.array(values, type=field.type))
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+def _row_groups(batches, row_group_rows: int) -> Iterator:
+    """Regroup record batches into tables of about row_group_rows rows (one Parquet row group each)"""
+    pending, rows = [], 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows >= row_group_rows:
+            yield pa.Table.from_batches(pending)
+            pending, rows = [], 0
+    if pending:
+        yield pa.Table.from_batches(pending)
+
+class _ChunkSink:
+    """Write-only file object whose written bytes are collected with take()"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def arrow_stream_chunks(batches) -> Iterator[bytes]:
+    """Arrow IPC stream format, one chunk per record batch"""
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, export_schema())
+    for batch in batches:
+        writer.write_batch(batch)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+def parquet_chunks(batches, row_group_rows: int) -> Iterator[bytes]:
+    """Parquet file bytes, one chunk per row group plus the footer
+
+    Parquet is written front to back (row groups, then the footer), so it can
+    be streamed without a seekable sink.
+    """
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, export_schema(), compression=PARQUET_COMPRESSION)
+    for table in _row_groups(batches, row_group_rows):
+        writer.write_table(table, row_group_size=table.num_rows)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+def write_export(conn, path: str, fmt: str, batch_size: int, row_group_rows: int) -> int:
+    """Write the export to path as an Arrow IPC file (memory-mappable) or Parquet; returns the row count"""
+    schema = export_schema()
+    rows = 0
+    batches = record_batches(conn, batch_size)
+    if fmt == "parquet":
+        with pq.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION) as writer:
+            for table in _row_groups(batches, row_group_rows):
+                writer.write_table(table, row_group_size=table.num_rows)
+                rows += table.num_rows
+    else:
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    return rows
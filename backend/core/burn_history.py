@@ -0,0 +1,317 @@
+"""
+Daily budget burn snapshots in columnar files, and trend/forecast math over them
+
+Each captured day is one YYYY-MM-DD.npy file: a structured array of every
+budget row sorted by (project_id, budget_id), memory-mapped on read so a
+per-project lookup is a binary search, not a scan. Old days are thinned
+out: every day is kept for BURN_HISTORY_DAILY_DAYS, then the last day of
+each week, then the last day of each month after BURN_HISTORY_WEEKLY_DAYS.
+"""
+import asyncio
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+from core.config import settings, BACKEND_DIR
+from core.database import run_db, fetch_all, iter_batches
+
+BURN_DTYPE = np.dtype([
+    ('project_id', '<i8'),
+    ('budget_id', '<i8'),
+    ('allocated', '<f8'),
+    ('burnt', '<f8'),
+    ('end_ordinal', '<i8')      # project end date as date.toordinal(), 0 if none
+])
+
+BURN_BUDGETS_QUERY = """
+    SELECT budget_id, project_id,
+           COALESCE(allocated_amount, 0) as allocated_amount,
+           COALESCE(burnt_amount, 0) as burnt_amount
+    FROM budgets
+"""
+BURN_PROJECTS_QUERY = "SELECT project_id, end_date FROM projects"
+
+def history_dir() -> str:
+    return settings.BURN_HISTORY_DIR or str(BACKEND_DIR / "data" / "burn_history")
+
+def load_burn_rows(conn) -> np.ndarray:
+    """Every budget row as a BURN_DTYPE array sorted by (project_id, budget_id)"""
+    end_dates = {
+        row['project_id']: row['end_date'].toordinal() if row['end_date'] is not None else 0
+        for row in fetch_all(conn, BURN_PROJECTS_QUERY, label="burn_capture_projects")
+    }
+    chunks = []
+    for rows in iter_batches(conn, BURN_BUDGETS_QUERY, batch_size=5000, label="burn_capture"):
+        chunk = np.empty(len(rows), dtype=BURN_DTYPE)
+        chunk['project_id'] = [row['project_id'] for row in rows]
+        chunk['budget_id'] = [row['budget_id'] for row in rows]
+        chunk['allocated'] = [float(row['allocated_amount']) for row in rows]
+        chunk['burnt'] = [float(row['burnt_amount']) for row in rows]
+        chunk['end_ordinal'] = [end_dates.get(row['project_id'], 0) for row in rows]
+        chunks.append(chunk)
+    data = np.concatenate(chunks) if chunks else np.empty(0, dtype=BURN_DTYPE)
+    return data[np.lexsort((data['budget_id'], data['project_id']))]
+
+class ProjectTotals(NamedTuple):
+    """One day's per-project sums, index-aligned and sorted by project_id"""
+    project_id: np.ndarray
+    allocated: np.ndarray
+    burnt: np.ndarray
+    end_ordinal: np.ndarray
+
+def _project_totals(data: np.ndarray) -> ProjectTotals:
+    if not len(data):
+        empty = np.empty(0)
+        return ProjectTotals(empty.astype(np.int64), empty, empty, empty.astype(np.int64))
+    # Rows are sorted by project_id, so each project is one contiguous run
+    project_id, starts = np.unique(data['project_id'], return_index=True)
+    return ProjectTotals(
+        project_id,
+        np.add.reduceat(data['allocated'], starts),
+        np.add.reduceat(data['burnt'], starts),
+        data['end_ordinal'][starts]
+    )
+
+class BurnHistory:
+    """Day files in one directory, with per-project totals cached per file"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._files: Dict[date, tuple] = {}     # day -> (mtime_ns, mapped rows, ProjectTotals)
+        self._captures = 0
+        self._removed = 0
+        self._last_capture_at: Optional[float] = None
+        self._last_capture_rows = 0
+
+    def path(self, day: date) -> str:
+        return os.path.join(self.directory, f"{day.isoformat()}.npy")
+
+    def _listing(self) -> Dict[date, int]:
+        """day -> mtime_ns for every day file on disk"""
+        listing = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return listing
+        for entry in entries:
+            name = entry.name
+            if not name.endswith(".npy"):
+                continue
+            try:
+                day = date.fromisoformat(name[:-4])
+                listing[day] = entry.stat().st_mtime_ns
+            except (ValueError, OSError):
+                continue
+        return listing
+
+    def version(self) -> str:
+        """Changes whenever a day file is written or removed"""
+        listing = self._listing()
+        if not listing:
+            return "empty"
+        newest = max(listing)
+        return f"{len(listing)}:{newest.isoformat()}:{listing[newest]}:{min(listing).isoformat()}"
+
+    def write(self, day: date, data: np.ndarray):
+        """Store one day's rows atomically (a re-capture replaces the day)"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(day)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, data, allow_pickle=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def capture(self, conn, day: Optional[date] = None) -> int:
+        """Snapshot the budgets table as day (default today) and thin out old days; returns the row count"""
+        day = day or date.today()
+        data = load_burn_rows(conn)
+        self.write(day, data)
+        self._removed += self.downsample(day)
+        self._captures += 1
+        self._last_capture_at = time.time()
+        self._last_capture_rows = len(data)
+        return len(data)
+
+    def downsample(self, today: date) -> int:
+        """Drop days no longer needed at their age's resolution; returns how many were removed"""
+        daily_cutoff = today - timedelta(days=settings.BURN_HISTORY_DAILY_DAYS)
+        weekly_cutoff = today - timedelta(days=settings.BURN_HISTORY_WEEKLY_DAYS)
+        keep: Dict[tuple, date] = {}
+        for day in sorted(self._listing()):
+            if day >= daily_cutoff:
+                bucket = ("day", day)
+            elif day >= weekly_cutoff:
+                bucket = ("week",) + tuple(day.isocalendar()[:2])
+            else:
+                bucket = ("month", day.year, day.month)
+            keep[bucket] = day  # days ascend, so the latest day in each bucket wins
+
+        kept = set(keep.values())
+        removed = 0
+        for day in self._listing():
+            if day not in kept:
+                try:
+                    os.remove(self.path(day))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def load(self) -> Dict[date, tuple]:
+        """Mapped rows and per-project totals for every day, re-reading only new or replaced files"""
+        listing = self._listing()
+        with self._lock:
+            files = {}
+            for day, mtime in listing.items():
+                cached = self._files.get(day)
+                if cached is not None and cached[0] == mtime:
+                    files[day] = cached
+                    continue
+                try:
+                    data = np.load(self.path(day), mmap_mode="r", allow_pickle=False)
+                except (OSError, ValueError) as e:
+                    print(f"Burn history read error for {day}: {e}")
+                    continue
+                if data.dtype != BURN_DTYPE:
+                    print(f"Burn history file for {day} has an unexpected layout, skipping")
+                    continue
+                files[day] = (mtime, data, _project_totals(data))
+            self._files = files
+            return dict(sorted(files.items()))
+
+    def project_trend(self, project_id: int, since: Optional[date] = None) -> dict:
+        """Per-day totals for one project and each of its budgets"""
+        points: List[dict] = []
+        budgets: Dict[int, list] = {}
+        for day, (_, data, totals) in self.load().items():
+            if since is not None and day < since:
+                continue
+            i = np.searchsorted(totals.project_id, project_id)
+            if i == len(totals.project_id) or totals.project_id[i] != project_id:
+                continue
+            label = day.isoformat()
+            points.append({
+                'date': label,
+                'allocated': float(totals.allocated[i]),
+                'burnt': float(totals.burnt[i])
+            })
+            ids = data['project_id']
+            lo = np.searchsorted(ids, project_id, side="left")
+            hi = np.searchsorted(ids, project_id, side="right")
+            rows = data[lo:hi]
+            for budget_id, allocated, burnt in zip(rows['budget_id'].tolist(), rows['allocated'].tolist(), rows['burnt'].tolist()):
+                budgets.setdefault(budget_id, []).append({'date': label, 'allocated': allocated, 'burnt': burnt})
+        return {
+            'project_id': project_id,
+            'points': points,
+            'budgets': [{'budget_id': budget_id, 'points': series} for budget_id, series in sorted(budgets.items())]
+        }
+
+    def forecast(self, window_days: int) -> dict:
+        """Portfolio burn rate and projected overrun from a least-squares fit over the last window_days"""
+        files = self.load()
+        if not files:
+            return {'as_of': None, 'window_days': window_days, 'snapshots': 0, 'portfolio': None, 'projects': []}
+
+        as_of = max(files)
+        window = [day for day in files if day >= as_of - timedelta(days=window_days)]
+        latest = files[as_of][2]
+
+        # Burnt per (project in the latest snapshot) x (day in the window); NaN where a project is absent
+        burnt = np.full((len(latest.project_id), len(window)), np.nan)
+        for t, day in enumerate(window):
+            totals = files[day][2]
+            idx = np.searchsorted(latest.project_id, totals.project_id)
+            idx = np.minimum(idx, max(len(latest.project_id) - 1, 0))
+            present = latest.project_id[idx] == totals.project_id if len(latest.project_id) else np.zeros(0, bool)
+            burnt[idx[present], t] = totals.burnt[present]
+
+        # Vectorized per-row slope (burn per day), skipping missing days
+        x = np.array([(day - as_of).days for day in window], dtype=np.float64)
+        seen = ~np.isnan(burnt)
+        y = np.where(seen, burnt, 0.0)
+        xs = np.where(seen, x, 0.0)
+        n = seen.sum(axis=1)
+        sx, sy = xs.sum(axis=1), y.sum(axis=1)
+        sxx, sxy = (xs * xs).sum(axis=1), (xs * y).sum(axis=1)
+        denom = n * sxx - sx * sx
+        rate = np.zeros(len(n))
+        np.divide(n * sxy - sx * sy, denom, out=rate, where=(n >= 2) & (denom > 0))
+        burning = np.maximum(rate, 0.0)
+
+        days_left = np.where(latest.end_ordinal > as_of.toordinal(), latest.end_ordinal - as_of.toordinal(), 0)
+        projected = latest.burnt + burning * days_left
+        overrun = np.maximum(projected - latest.allocated, 0.0)
+        remaining = latest.allocated - latest.burnt
+        exhausts = (burning > 0) & (remaining > 0)
+        days_to_exhaust = np.zeros(len(n))
+        np.divide(remaining, burning, out=days_to_exhaust, where=exhausts)
+
+        at_risk = np.flatnonzero(overrun > 0)
+        at_risk = at_risk[np.argsort(-overrun[at_risk], kind="stable")]
+        projects = []
+        for i in at_risk.tolist():
+            exhaust_date = None
+            if exhausts[i]:
+                exhaust_date = (as_of + timedelta(days=int(np.ceil(days_to_exhaust[i])))).isoformat()
+            projects.append({
+                'project_id': int(latest.project_id[i]),
+                'allocated': float(latest.allocated[i]),
+                'burnt': float(latest.burnt[i]),
+                'burn_rate_per_day': round(float(rate[i]), 2),
+                'days_remaining': int(days_left[i]),
+                'projected_burnt': round(float(projected[i]), 2),
+                'projected_overrun': round(float(overrun[i]), 2),
+                'budget_exhausted_on': exhaust_date
+            })
+
+        return {
+            'as_of': as_of.isoformat(),
+            'window_days': window_days,
+            'snapshots': len(window),
+            'portfolio': {
+                'projects': len(latest.project_id),
+                'allocated': round(float(latest.allocated.sum()), 2),
+                'burnt': round(float(latest.burnt.sum()), 2),
+                # The rates the projection used: shrinking burnt (corrections) does not offset other projects
+                'burn_rate_per_day': round(float(burning.sum()), 2),
+                'projected_burnt': round(float(projected.sum()), 2),
+                'projected_overrun': round(float(overrun.sum()), 2),
+                'projects_projected_over_budget': len(projects)
+            },
+            'projects': projects
+        }
+
+    def stats(self) -> dict:
+        listing = self._listing()
+        return {
+            "directory": self.directory,
+            "days": len(listing),
+            "oldest": min(listing).isoformat() if listing else None,
+            "newest": max(listing).isoformat() if listing else None,
+            "captures": self._captures,
+            "removed": self._removed,
+            "last_capture_at": self._last_capture_at,
+            "last_capture_rows": self._last_capture_rows
+        }
+
+burn_history = BurnHistory(history_dir())
+
+async def capture_periodically():
+    """Background task: capture today's burn snapshot once per BURN_HISTORY_CAPTURE_INTERVAL"""
+    while True:
+        try:
+            # The file's mtime is shared, so with several workers only one captures per interval
+            path = burn_history.path(date.today())
+            if not os.path.exists(path) or time.time() - os.path.getmtime(path) >= settings.BURN_HISTORY_CAPTURE_INTERVAL:
+                await run_db(burn_history.capture, read_only=True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Burn history capture error: {e}")
+        await asyncio.sleep(min(settings.BURN_HISTORY_CAPTURE_INTERVAL, 300))
@@ -0,0 +1,142 @@
+"""
+gzip/brotli response compression negotiated from Accept-Encoding
+"""
+import gzip
+import time
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from core.config import settings
+from core.profiling import record as profile_phase
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Bodies above this are compressed off the event loop
+INLINE_COMPRESS_LIMIT = 64 * 1024
+
+def supported_encodings() -> tuple:
+    """Encodings this server can produce, most preferred first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported encoding the client accepts (None = send uncompressed)"""
+    if not settings.COMPRESSION_ENABLED or not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:  # ties keep the earlier (preferred) encoding
+            best, best_q = encoding, q
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+async def compress_async(body: bytes, encoding: str) -> bytes:
+    start = time.perf_counter()
+    try:
+        if len(body) > INLINE_COMPRESS_LIMIT:
+            return await run_in_threadpool(compress, body, encoding)
+        return compress(body, encoding)
+    finally:
+        profile_phase("serialization", time.perf_counter() - start)
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """Validator for one content-coding of a representation (each coding gets its own strong ETag)"""
+    if encoding is None:
+        return etag
+    weak = etag.startswith("W/")
+    opaque = etag[2:] if weak else etag
+    return ("W/" if weak else "") + opaque[:-1] + "-" + encoding + '"'
+
+def should_compress(body: bytes, content_type: str) -> bool:
+    return len(body) >= settings.COMPRESSION_MIN_SIZE and content_type.startswith(COMPRESSIBLE_TYPES)
+
+def _header(headers: list, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+class CompressionMiddleware:
+    """Compress complete (non-streaming) responses above COMPRESSION_MIN_SIZE
+
+    Responses that already carry Content-Encoding (the pre-compressed
+    analytics cache) and streamed bodies (SSE, exports) pass through as is.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = choose_encoding(accept.decode("latin-1") if accept else None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        decided = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, decided
+            if decided:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            decided = True
+            headers = list(start_message.get("headers", []))
+            body = message.get("body", b"")
+            content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+            if (
+                message.get("more_body", False)
+                or start_message["status"] != 200
+                or _header(headers, b"content-encoding") is not None
+                or not should_compress(body, content_type)
+            ):
+                await send(start_message)
+                await send(message)
+                return
+
+            body = await compress_async(body, encoding)
+            original = start_message.get("headers", [])
+            headers = [(k, v) for k, v in headers if k.lower() not in (b"content-length", b"vary", b"etag")]
+            vary = _header(original, b"vary")
+            etag = _header(original, b"etag")
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            if vary and b"accept-encoding" not in vary.lower():
+                vary += b", Accept-Encoding"
+            headers.append((b"vary", vary or b"Accept-Encoding"))
+            if etag is not None:
+                headers.append((b"etag", encoded_etag(etag.decode("latin-1"), encoding).encode("latin-1")))
+            await send({**start_message, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -18,6 +18,15 @@ class Settings(BaseSettings):
     # Server
     HOST: str = "0.0.0.0"
     PORT: int = 5000
+    # Pre-forked uvicorn workers; more than one turns on the shared snapshot
+    WORKERS: int = 1
+
+    # Shared analytics snapshot: one worker (flock holder) builds it, all workers serve it via mmap
+    SNAPSHOT_ENABLED: bool = False
+    SNAPSHOT_PATH: Optional[str] = None
+    SNAPSHOT_REFRESH_INTERVAL: float = 5.0
+    # Older snapshots (dead publisher) are ignored and requests go to the DB
+    SNAPSHOT_MAX_AGE: float = 60.0
 
     # Database
     DB_CONNECTION_STRING: Optional[str] = None
@@ -27,10 +36,118 @@ class Settings(BaseSettings):
     DB_NAME: Optional[str] = None
     DB_PORT: int = 3306
 
+    # Connection pool
+    DB_POOL_ENABLED: bool = True
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_MAX_LIFETIME: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Read replicas for analytics reads: comma-separated connection strings.
+    # Keep DB_REPLICA_MAX_LAG below ROLLUP_WATERMARK_OVERLAP.
+    DB_REPLICA_URLS: Optional[str] = None
+    DB_REPLICA_MAX_LAG: float = 30.0
+    DB_REPLICA_CHECK_INTERVAL: float = 10.0
+    DB_REPLICA_TIMEOUT: float = 2.0
+
+    # Circuit breaker: after this many consecutive connection failures, stop trying the primary
+    # (fail fast with 503) and let one trial attempt through every DB_BREAKER_RESET_TIMEOUT seconds
+    DB_BREAKER_FAILURES: int = 5
+    DB_BREAKER_RESET_TIMEOUT: float = 10.0
+
+    # Server-side MAX_EXECUTION_TIME in ms (0 = none) for work outside an admission class (background jobs)
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Admission control: concurrent DB loads per endpoint class, each with a bounded wait queue;
+    # a full queue or a wait over ADMISSION_QUEUE_TIMEOUT answers 503 with Retry-After.
+    # Keep the concurrency sum at or below DB_POOL_MAX_SIZE and DB_EXECUTOR_WORKERS.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_LIGHT_CONCURRENCY: int = 6
+    ADMISSION_HEAVY_CONCURRENCY: int = 3
+    ADMISSION_EXPORT_CONCURRENCY: int = 1
+    ADMISSION_QUEUE_SIZE: int = 50
+    ADMISSION_QUEUE_TIMEOUT: float = 5.0
+    ADMISSION_RETRY_AFTER: int = 2
+    # Statement timeouts per class in ms (0 = none)
+    LIGHT_STATEMENT_TIMEOUT_MS: int = 5000
+    HEAVY_STATEMENT_TIMEOUT_MS: int = 30000
+    EXPORT_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Query execution: "threadpool" runs DB work off the event loop, "inline" runs it on the loop
+    DB_EXECUTION_MODE: str = "threadpool"
+    DB_EXECUTOR_WORKERS: int = 10
+    # Return DECIMAL columns as float from fetch_all/fetch_one/iter_batches (only those columns are converted)
+    DB_DECIMAL_AS_FLOAT: bool = True
+
+    # Analytics result cache
+    ANALYTICS_CACHE_ENABLED: bool = True
+    ANALYTICS_CACHE_TTL: float = 30.0
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 256
+    # How long a data-version probe (used for ETags) is reused
+    ANALYTICS_VERSION_TTL: float = 2.0
+    # Timeline interval index lifetime; it is keyed by data version, so it is rebuilt on any change anyway
+    TIMELINE_INDEX_TTL: float = 3600.0
+
+    # Response compression (br/gzip by Accept-Encoding) for bodies of at least COMPRESSION_MIN_SIZE bytes
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+    # Encoded (and compressed) analytics bodies kept per ETag and encoding
+    ENCODED_CACHE_MAX_ENTRIES: int = 512
+
+    # Share one in-flight DB load between concurrent identical analytics requests
+    QUERY_COALESCING_ENABLED: bool = True
+
+    # Per-project budget rollup (in-process, refreshed from budgets.updated_at)
+    ROLLUP_ENABLED: bool = True
+    ROLLUP_REFRESH_INTERVAL: float = 15.0
+    ROLLUP_REBUILD_INTERVAL: float = 900.0
+    ROLLUP_WATERMARK_OVERLAP: int = 60
+
+    # Streaming export (Arrow/Parquet formats fetch larger batches: one record batch per fetch)
+    EXPORT_BATCH_SIZE: int = 1000
+    EXPORT_ARROW_BATCH_SIZE: int = 10000
+    EXPORT_PARQUET_ROW_GROUP_ROWS: int = 100000
+
+    # Daily budget burn history (columnar day files; default directory backend/data/burn_history)
+    BURN_HISTORY_ENABLED: bool = True
+    BURN_HISTORY_DIR: Optional[str] = None
+    BURN_HISTORY_CAPTURE_INTERVAL: float = 3600.0
+    # Keep every day this long, then one per week, then one per month after BURN_HISTORY_WEEKLY_DAYS
+    BURN_HISTORY_DAILY_DAYS: int = 90
+    BURN_HISTORY_WEEKLY_DAYS: int = 730
+
+    # Live dashboard stream (one shared DB poll per interval, regardless of viewer count)
+    LIVE_UPDATES_ENABLED: bool = True
+    LIVE_POLL_INTERVAL: float = 10.0
+    LIVE_KEEPALIVE_INTERVAL: float = 15.0
+    # Lifetime of the stream-only token passed as ?access_token= (only needs to outlive opening the stream)
+    STREAM_TOKEN_EXPIRE_SECONDS: int = 60
+
+    # Prometheus /metrics endpoint and request/query instrumentation
+    METRICS_ENABLED: bool = True
+    # Log EXPLAIN for queries slower than this (0 = off), at most once per query label per interval
+    SLOW_QUERY_THRESHOLD_MS: float = 0
+    SLOW_QUERY_EXPLAIN_INTERVAL: float = 300.0
+
+    # Per-request profiling: ?profile=1 or X-Profile: 1 (authenticated) profiles one request;
+    # PROFILING_SAMPLE_RATE of all requests are profiled too, and the slowest of those written to PROFILING_DIR
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILING_SLOW_THRESHOLD_MS: float = 500.0
+    PROFILING_KEEP: int = 20
+    PROFILING_DIR: Optional[str] = None
+
     # JWT
     JWT_SECRET_KEY: Optional[str] = None
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Cache verified tokens until their exp so repeat requests skip signature checks
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAX_ENTRIES: int = 1024
 
     # Frontend auth
     FRONTEND_API_KEY: Optional[str] = None
@@ -1,10 +1,21 @@
 """
 Database connection utilities
 """
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional, Sequence
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.constants import FieldType
 from urllib.parse import urlparse, parse_qs, unquote
 from core.config import settings
+from core.metrics import db_acquire_latency, db_query_latency, db_query_rows, db_query_errors, db_slow_queries
+from core.profiling import record as profile_phase, run_work
 
 def parse_connection_string(conn_str: str) -> dict:
     """Parse MySQL connection string into connection config"""
@@ -56,38 +67,849 @@ def parse_connection_string(conn_str: str) -> dict:
     except Exception as e:
         raise ValueError(f"Failed to parse connection string: {e}")
 
+def _url_config(conn_str: str) -> dict:
+    connection_config = parse_connection_string(conn_str)
+    if "mysql.database.azure.com" in connection_config.get("host", "").lower():
+        connection_config["ssl_disabled"] = False
+        connection_config["ssl_verify_cert"] = True
+        connection_config["ssl_verify_identity"] = True
+    return connection_config
+
+def get_connection_config() -> dict:
+    """Build the MySQL connection config from settings"""
+    if settings.DB_CONNECTION_STRING:
+        return _url_config(settings.DB_CONNECTION_STRING)
+    elif settings.DB_HOST and settings.DB_USER and settings.DB_PASSWORD and settings.DB_NAME:
+        return {
+            "host": settings.DB_HOST,
+            "user": settings.DB_USER,
+            "password": settings.DB_PASSWORD,
+            "database": settings.DB_NAME,
+            "port": settings.DB_PORT
+        }
+    else:
+        raise ValueError("DB configuration must be set")
+
+_connection_config: Optional[dict] = None
+
+def _connect():
+    """Open a new MySQL connection, raising on failure"""
+    global _connection_config
+    if _connection_config is None:
+        _connection_config = get_connection_config()
+    return mysql.connector.connect(**_connection_config)
+
 def get_db_connection():
     """Get a MySQL database connection"""
     try:
-        connection_config = {}
-        
-        if settings.DB_CONNECTION_STRING:
-            connection_config = parse_connection_string(settings.DB_CONNECTION_STRING)
-            if "mysql.database.azure.com" in connection_config.get("host", "").lower():
-                connection_config["ssl_disabled"] = False
-                connection_config["ssl_verify_cert"] = True
-                connection_config["ssl_verify_identity"] = True
-        elif settings.DB_HOST and settings.DB_USER and settings.DB_PASSWORD and settings.DB_NAME:
-            connection_config = {
-                "host": settings.DB_HOST,
-                "user": settings.DB_USER,
-                "password": settings.DB_PASSWORD,
-                "database": settings.DB_NAME,
-                "port": settings.DB_PORT
+        return _connect()
+    except Error as e:
+        print(f"DB connection error: {e}")
+        return None
+    except Exception as e:
+        print(f"DB configuration error: {e}")
+        return None
+
+class PoolTimeout(Exception):
+    """No pooled connection became available within the checkout timeout"""
+
+class CircuitBreaker:
+    """Stops connection attempts to the primary while it is down
+
+    After `failures` consecutive connection errors the circuit opens and
+    checkouts fail immediately; one trial attempt is let through every
+    `reset_timeout` seconds, and the first success closes it again. Pool
+    timeouts (a busy, not a down, DB) do not count as failures.
+    """
+
+    def __init__(self, failures: int = 5, reset_timeout: float = 10.0):
+        self.failures = max(1, failures)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._open = False
+        self._retry_at = 0.0
+        self._opens = 0
+        self._rejected = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    def allow(self) -> bool:
+        """True if a connection attempt may be made now"""
+        with self._lock:
+            if not self._open:
+                return True
+            now = time.monotonic()
+            if now >= self._retry_at:
+                # Half-open: this caller is the trial; others keep failing fast until it reports back
+                self._retry_at = now + self.reset_timeout
+                return True
+            self._rejected += 1
+            return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next trial attempt (0 when closed)"""
+        if not self._open:
+            return 0.0
+        return max(0.0, self._retry_at - time.monotonic())
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            if self._open:
+                self._open = False
+                print("DB circuit closed: connection succeeded")
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._open:
+                self._retry_at = time.monotonic() + self.reset_timeout
+            elif self._consecutive >= self.failures:
+                self._open = True
+                self._opens += 1
+                self._retry_at = time.monotonic() + self.reset_timeout
+                print(f"DB circuit opened after {self._consecutive} consecutive connection failures")
+
+    def stats(self) -> dict:
+        return {
+            "state": "open" if self._open else "closed",
+            "consecutive_failures": self._consecutive,
+            "opens": self._opens,
+            "rejected": self._rejected,
+            "retry_after_seconds": round(self.retry_after(), 3)
+        }
+
+db_breaker = CircuitBreaker(settings.DB_BREAKER_FAILURES, settings.DB_BREAKER_RESET_TIMEOUT)
+
+class ConnectionPool:
+    """Thread-safe, bounded pool of MySQL connections"""
+
+    def __init__(
+        self,
+        connect: Callable,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        max_lifetime: float = 1800,
+        pre_ping: bool = True
+    ):
+        self._connect = connect
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.pre_ping = pre_ping
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._born = {}
+        self._size = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+        self._wait_seconds = 0.0
+
+    def fill(self):
+        """Open connections until min_size are idle"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def acquire(self):
+        """Borrow a validated connection, waiting up to the checkout timeout"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("Connection pool is closed")
+                    if self._idle:
+                        conn = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No DB connection available after {self.timeout}s")
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._usable(conn):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._checkouts += 1
+                if waited:
+                    self._waits += 1
+                    self._wait_seconds += time.monotonic() - start
+            return conn
+
+    def release(self, conn):
+        """Return a borrowed connection to the pool"""
+        if id(conn) not in self._born:
+            self._close_quietly(conn)
+            return
+
+        try:
+            # End the implicit read transaction so the next borrower sees fresh data
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        if self._expired(conn):
+            with self._cond:
+                self._recycled += 1
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                closing = True
+            else:
+                closing = False
+                self._idle.append(conn)
+                self._cond.notify()
+        if closing:
+            self._discard(conn)
+
+    def close(self):
+        """Close idle connections; borrowed ones are closed on release"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage counters"""
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "discarded": self._discarded,
+                "avg_wait_ms": round(self._wait_seconds / self._waits * 1000, 3) if self._waits else 0.0,
+                "closed": self._closed
             }
-        else:
-            raise ValueError("DB configuration must be set")
-        
-        return mysql.connector.connect(**connection_config)
+
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._created += 1
+        return conn
+
+    def _expired(self, conn) -> bool:
+        if not self.max_lifetime or self.max_lifetime <= 0:
+            return False
+        born = self._born.get(id(conn))
+        return born is None or time.monotonic() - born > self.max_lifetime
+
+    def _usable(self, conn) -> bool:
+        if self._expired(conn):
+            with self._cond:
+                self._recycled += 1
+            return False
+        if not self.pre_ping:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        with self._cond:
+            if self._born.pop(id(conn), None) is not None:
+                self._size -= 1
+                self._discarded += 1
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> Optional[ConnectionPool]:
+    """Get the shared connection pool, creating it on first use"""
+    global _pool
+    if not settings.DB_POOL_ENABLED:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _connect,
+                    min_size=settings.DB_POOL_MIN_SIZE,
+                    max_size=settings.DB_POOL_MAX_SIZE,
+                    timeout=settings.DB_POOL_TIMEOUT,
+                    max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+                    pre_ping=settings.DB_POOL_PRE_PING
+                )
+    return _pool
+
+def init_pool():
+    """Create the pool and open its minimum connections"""
+    pool = get_pool()
+    if not pool:
+        return
+    try:
+        pool.fill()
+    except Error as e:
+        print(f"DB pool warm-up error: {e}")
+    except Exception as e:
+        print(f"DB configuration error: {e}")
+
+def close_pool():
+    """Close the shared pool and any replica pools"""
+    global _pool, _replicas
+    with _pool_lock:
+        pool, _pool = _pool, None
+        replicas, _replicas = _replicas, None
+    if pool:
+        pool.close()
+    if replicas:
+        replicas.close()
+
+def acquire_connection(read_only: bool = False, timeout_ms: Optional[int] = None):
+    """Borrow a connection from the pool (or open one if pooling is off)
+
+    With read_only, a healthy replica is used when one is configured,
+    falling back to the primary. The session's statement timeout is set to
+    timeout_ms, else the one for the current context (statement_timeout_ms),
+    else DB_STATEMENT_TIMEOUT_MS.
+    """
+    start = time.perf_counter()
+    try:
+        conn = None
+        if read_only:
+            replicas = get_replicas()
+            if replicas:
+                conn = replicas.acquire()
+        if conn is None:
+            conn = _acquire_connection()
+    finally:
+        elapsed = time.perf_counter() - start
+        db_acquire_latency.observe((), elapsed)
+        profile_phase("db_acquire", elapsed)
+
+    if conn is not None:
+        if timeout_ms is None:
+            timeout_ms = statement_timeout_ms.get()
+        if timeout_ms is None:
+            timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+        if not _apply_statement_timeout(conn, timeout_ms):
+            # Dead connection (e.g. idle past wait_timeout with DB_POOL_PRE_PING off): the pool discards it
+            release_connection(conn)
+            return None
+    return conn
+
+def _acquire_connection():
+    if not db_breaker.allow():
+        return None
+    pool = get_pool()
+    try:
+        conn = pool.acquire() if pool else _connect()
+    except PoolTimeout as e:
+        print(f"DB pool error: {e}")
+        return None
     except Error as e:
         print(f"DB connection error: {e}")
+        db_breaker.record_failure()
         return None
     except Exception as e:
         print(f"DB configuration error: {e}")
+        db_breaker.record_failure()
         return None
+    db_breaker.record_success()
+    return conn
 
-def get_db_cursor(conn):
-    """Get a dictionary cursor from connection"""
-    if conn:
-        return conn.cursor(dictionary=True)
-    return None
+# Server-side statement timeout (ms, 0 = none) for connections checked out in this context;
+# None falls back to DB_STATEMENT_TIMEOUT_MS. Set per endpoint class by core.admission.
+statement_timeout_ms: contextvars.ContextVar = contextvars.ContextVar("statement_timeout_ms", default=None)
+
+ER_QUERY_TIMEOUT = 3024
+ER_UNKNOWN_SYSTEM_VARIABLE = 1193
+
+class QueryTimeout(Exception):
+    """The server stopped a query at its MAX_EXECUTION_TIME"""
+
+_timeout_unsupported = False
+
+def _apply_statement_timeout(conn, timeout_ms: int) -> bool:
+    """Set the session's MAX_EXECUTION_TIME (read-only SELECTs) if it differs from the connection's current one
+
+    Returns False if the connection is unusable (no cursor could be opened).
+    """
+    global _timeout_unsupported
+    if _timeout_unsupported or getattr(conn, "_statement_timeout_ms", None) == timeout_ms:
+        return True
+    try:
+        cursor = conn.cursor()
+    except Error as e:
+        print(f"DB connection unusable: {e}")
+        return False
+    try:
+        cursor.execute("SET SESSION max_execution_time = %s", (int(timeout_ms),))
+        conn._statement_timeout_ms = timeout_ms
+    except Error as e:
+        if e.errno == ER_UNKNOWN_SYSTEM_VARIABLE:
+            # e.g. MariaDB, which has max_statement_time instead; queries then run unbounded
+            _timeout_unsupported = True
+            print(f"DB statement timeout not supported, disabled: {e}")
+        else:
+            # Transient (lost connection, lock wait...): left unset, so the next checkout retries
+            print(f"Failed to set DB statement timeout: {e}")
+    finally:
+        cursor.close()
+    return True
+
+def release_connection(conn):
+    """Return a connection obtained from acquire_connection"""
+    replicas = _replicas
+    if replicas and replicas.release(conn):
+        return
+    pool = _pool if settings.DB_POOL_ENABLED else None
+    if pool:
+        pool.release(conn)
+    else:
+        conn.close()
+
+def pool_stats() -> dict:
+    """Pool stats for the status endpoint"""
+    pool = get_pool()
+    if not pool:
+        return {"enabled": False}
+    return {"enabled": True, **pool.stats()}
+
+def _replication_lag(conn) -> float:
+    """Seconds the replica is behind its source; raises if replication is stopped or not visible"""
+    for statement, column in (
+        ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+        ("SHOW SLAVE STATUS", "Seconds_Behind_Master")
+    ):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(statement)
+            rows = cursor.fetchall()
+        except Error:
+            # MySQL < 8.0.22 only knows SHOW SLAVE STATUS
+            continue
+        finally:
+            cursor.close()
+        if not rows:
+            # Managed read endpoints may not expose replication status
+            return 0.0
+        lag = rows[0].get(column)
+        if lag is None:
+            raise RuntimeError("replication is not running")
+        return float(lag)
+    raise RuntimeError("cannot read replication status (needs REPLICATION CLIENT)")
+
+class Replica:
+    """One read replica: its own pool plus the last health check result"""
+
+    def __init__(self, name: str, pool: ConnectionPool):
+        self.name = name
+        self.pool = pool
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.reads = 0
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "checked_at": self.checked_at,
+            "reads": self.reads,
+            "pool": self.pool.stats()
+        }
+
+class ReplicaSet:
+    """Round-robin read routing over replicas that passed their last health check"""
+
+    def __init__(self, replicas: List[Replica], max_lag: float):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self._lock = threading.Lock()
+        self._owners = {}
+        self._next = 0
+        self._fallbacks = 0
+
+    def acquire(self):
+        """Borrow a connection from a healthy replica, or None if the primary should be used"""
+        healthy = [r for r in self.replicas if r.healthy]
+        if healthy:
+            with self._lock:
+                start = self._next
+                self._next += 1
+            for i in range(len(healthy)):
+                replica = healthy[(start + i) % len(healthy)]
+                try:
+                    conn = replica.pool.acquire()
+                except PoolTimeout:
+                    # Busy, not broken: try the next one
+                    continue
+                except Exception as e:
+                    self._mark(replica, False, None, str(e))
+                    continue
+                with self._lock:
+                    self._owners[id(conn)] = replica.pool
+                replica.reads += 1
+                return conn
+        with self._lock:
+            self._fallbacks += 1
+        return None
+
+    def release(self, conn) -> bool:
+        """Return conn to its replica pool; False if it did not come from a replica"""
+        with self._lock:
+            pool = self._owners.pop(id(conn), None)
+        if pool is None:
+            return False
+        pool.release(conn)
+        return True
+
+    def check(self):
+        """Probe every replica's reachability and lag (blocking)"""
+        for replica in self.replicas:
+            try:
+                conn = replica.pool.acquire()
+            except Exception as e:
+                self._mark(replica, False, None, str(e))
+                continue
+            try:
+                lag = _replication_lag(conn)
+            except Exception as e:
+                self._mark(replica, False, None, str(e))
+            else:
+                if lag > self.max_lag:
+                    self._mark(replica, False, lag, f"lag {lag:.0f}s exceeds {self.max_lag:.0f}s")
+                else:
+                    self._mark(replica, True, lag, None)
+            finally:
+                replica.pool.release(conn)
+
+    def close(self):
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def stats(self) -> dict:
+        return {
+            "max_lag_seconds": self.max_lag,
+            "healthy": sum(1 for r in self.replicas if r.healthy),
+            "primary_fallbacks": self._fallbacks,
+            "replicas": [r.stats() for r in self.replicas]
+        }
+
+    @staticmethod
+    def _mark(replica: Replica, healthy: bool, lag: Optional[float], error: Optional[str]):
+        if replica.healthy and not healthy:
+            print(f"DB replica {replica.name} removed from rotation: {error}")
+        elif healthy and not replica.healthy:
+            print(f"DB replica {replica.name} in rotation (lag {lag:.0f}s)")
+        replica.healthy = healthy
+        replica.lag = lag
+        replica.error = error
+        replica.checked_at = time.time()
+
+_replicas: Optional[ReplicaSet] = None
+
+def get_replicas() -> Optional[ReplicaSet]:
+    """Replica set from DB_REPLICA_URLS, or None when no replicas are configured"""
+    global _replicas
+    if not settings.DB_REPLICA_URLS:
+        return None
+    if _replicas is None:
+        with _pool_lock:
+            if _replicas is None:
+                replicas = []
+                for url in settings.DB_REPLICA_URLS.split(","):
+                    if not url.strip():
+                        continue
+                    config = _url_config(url.strip())
+                    pool = ConnectionPool(
+                        functools.partial(mysql.connector.connect, **config),
+                        min_size=0,
+                        max_size=settings.DB_POOL_MAX_SIZE,
+                        timeout=settings.DB_REPLICA_TIMEOUT,
+                        max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+                        pre_ping=settings.DB_POOL_PRE_PING
+                    )
+                    replicas.append(Replica(f"{config['host']}:{config['port']}", pool))
+                _replicas = ReplicaSet(replicas, settings.DB_REPLICA_MAX_LAG)
+    return _replicas
+
+def replica_stats() -> dict:
+    """Replica health for the status endpoint"""
+    replicas = get_replicas()
+    if not replicas:
+        return {"enabled": False}
+    return {"enabled": True, **replicas.stats()}
+
+async def check_replicas_periodically():
+    """Background task: health-check replicas so reads only go to reachable, fresh ones"""
+    while True:
+        replicas = get_replicas()
+        if replicas:
+            try:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(get_executor(), replicas.check)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"DB replica health check error: {e}")
+        await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+
+class DatabaseUnavailable(Exception):
+    """No DB connection could be obtained"""
+
+class CircuitOpen(DatabaseUnavailable):
+    """The circuit breaker is open, so no connection was attempted"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Database unavailable.")
+        self.retry_after = retry_after
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """Bounded thread pool that runs blocking DB work"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.DB_EXECUTOR_WORKERS),
+                    thread_name_prefix="db"
+                )
+    return _executor
+
+def shutdown_executor():
+    """Stop the DB executor, waiting for running queries"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor:
+        executor.shutdown(wait=True)
+
+def _with_connection(func: Callable, args: tuple, kwargs: dict, read_only: bool = False) -> Any:
+    conn = acquire_connection(read_only)
+    if not conn:
+        if db_breaker.is_open:
+            raise CircuitOpen(db_breaker.retry_after())
+        raise DatabaseUnavailable("Database unavailable.")
+    try:
+        return run_work(func, conn, *args, **kwargs)
+    except Error as e:
+        if e.errno == ER_QUERY_TIMEOUT:
+            raise QueryTimeout(f"Query exceeded the {getattr(conn, '_statement_timeout_ms', 0)}ms statement timeout") from e
+        raise
+    finally:
+        release_connection(conn)
+
+async def run_db(func: Callable, *args, read_only: bool = False, **kwargs) -> Any:
+    """Run func(conn, *args, **kwargs) with a pooled connection without blocking the event loop
+
+    read_only work may be routed to a replica (see get_replicas).
+    """
+    if settings.DB_EXECUTION_MODE.lower() == "inline":
+        return _with_connection(func, args, kwargs, read_only)
+
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, _with_connection, func, args, kwargs, read_only)
+    return await loop.run_in_executor(get_executor(), call)
+
+_last_explained: dict = {}
+
+def _check_slow_query(conn, label: str, query: str, params, elapsed: float):
+    """Log EXPLAIN for queries over SLOW_QUERY_THRESHOLD_MS (at most once per label per interval)"""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if not threshold or elapsed * 1000 < threshold:
+        return
+    db_slow_queries.inc((label,))
+
+    now = time.monotonic()
+    last = _last_explained.get(label)
+    if last is not None and now - last < settings.SLOW_QUERY_EXPLAIN_INTERVAL:
+        return
+    _last_explained[label] = now
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("EXPLAIN " + query, params or ())
+            plan = cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as e:
+        print(f"Slow query [{label}] {elapsed * 1000:.0f}ms (EXPLAIN failed: {e})")
+        return
+
+    print(f"Slow query [{label}] {elapsed * 1000:.0f}ms: {' '.join(query.split())}")
+    for row in plan:
+        row = {k.lower(): v for k, v in row.items()}
+        full_scan = str(row.get('type')).upper() == "ALL"
+        print(
+            f"  table={row.get('table')} type={row.get('type')} key={row.get('key')} "
+            f"rows={row.get('rows')} extra={row.get('extra')}"
+            + ("  <-- full table scan" if full_scan else "")
+        )
+
+_DECIMAL_TYPES = (FieldType.DECIMAL, FieldType.NEWDECIMAL)
+
+def _decimal_columns(cursor) -> list:
+    """Names of the result's DECIMAL columns when DB_DECIMAL_AS_FLOAT is on
+
+    Converting just these after the fetch keeps the C extension's native row
+    conversion (a converter_class would route every value through Python).
+    """
+    if not settings.DB_DECIMAL_AS_FLOAT:
+        return []
+    return [d[0] for d in cursor.description or () if d[1] in _DECIMAL_TYPES]
+
+def _decimals_to_float(rows: list, columns: list) -> list:
+    for row in rows:
+        for name in columns:
+            value = row[name]
+            if value is not None:
+                row[name] = float(value)
+    return rows
+
+def fetch_all(conn, query: str, params: Optional[Sequence] = None, label: str = "unlabeled") -> list:
+    """Run a query and return all rows as dicts (timed under label)"""
+    start = time.perf_counter()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params or ())
+        rows = cursor.fetchall()
+        decimals = _decimal_columns(cursor)
+    except Exception:
+        db_query_errors.inc((label,))
+        raise
+    finally:
+        cursor.close()
+    elapsed = time.perf_counter() - start
+    db_query_latency.observe((label,), elapsed)
+    profile_phase("db_query", elapsed)
+    db_query_rows.inc((label,), len(rows))
+    _check_slow_query(conn, label, query, params, elapsed)
+    return _decimals_to_float(rows, decimals) if decimals else rows
+
+def fetch_one(conn, query: str, params: Optional[Sequence] = None, label: str = "unlabeled") -> Optional[dict]:
+    """Run a query and return the first row as a dict (timed under label)"""
+    start = time.perf_counter()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params or ())
+        row = cursor.fetchone()
+        if row is not None:
+            cursor.fetchall()
+        decimals = _decimal_columns(cursor)
+    except Exception:
+        db_query_errors.inc((label,))
+        raise
+    finally:
+        cursor.close()
+    elapsed = time.perf_counter() - start
+    db_query_latency.observe((label,), elapsed)
+    profile_phase("db_query", elapsed)
+    db_query_rows.inc((label,), 0 if row is None else 1)
+    _check_slow_query(conn, label, query, params, elapsed)
+    if row is not None and decimals:
+        _decimals_to_float([row], decimals)
+    return row
+
+def iter_batches(
+    conn, query: str, params: Optional[Sequence] = None, batch_size: int = 1000, label: str = "unlabeled"
+) -> Iterator[list]:
+    """Stream a query through an unbuffered cursor, yielding lists of up to batch_size dict rows
+
+    Only time spent inside the driver is counted, not time the consumer holds a batch.
+    """
+    elapsed = 0.0
+    completed = False
+    start = time.perf_counter()
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(query, params or ())
+        decimals = _decimal_columns(cursor)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            elapsed += time.perf_counter() - start
+            if not rows:
+                break
+            db_query_rows.inc((label,), len(rows))
+            yield _decimals_to_float(rows, decimals) if decimals else rows
+            start = time.perf_counter()
+        completed = True
+    except Exception:
+        db_query_errors.inc((label,))
+        raise
+    finally:
+        db_query_latency.observe((label,), elapsed)
+        profile_phase("db_query", elapsed)
+        try:
+            cursor.close()
+        except Error:
+            # Abandoned mid-stream: the connection still has unread rows and
+            # will be discarded by the pool on release
+            pass
+    if completed:
+        _check_slow_query(conn, label, query, params, elapsed)
@@ -0,0 +1,134 @@
+"""
+Server-push dashboard updates: one change detector shared by all subscribers
+"""
+import asyncio
+from datetime import date
+from typing import Dict, Optional, Set
+import orjson
+from core.config import settings
+from core.database import run_db
+from core.analytics import SECTIONS, load_dataset, load_data_version, build_dashboard
+from core.snapshot import snapshot_enabled, snapshot_reader
+
+def _load_sections(conn) -> dict:
+    return build_dashboard(load_dataset(conn), date.today())
+
+class DashboardBroadcaster:
+    """Polls the DB once per interval for everyone and fans out changed sections
+
+    Each subscriber gets an asyncio.Queue of pre-encoded event payloads. A
+    subscriber that falls behind has its backlog replaced by one full snapshot.
+    """
+
+    def __init__(self, interval: float, queue_size: int = 8):
+        self.interval = interval
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._encoded: Dict[str, bytes] = {}
+        self._version: Optional[str] = None
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self._polls = 0
+        self._recomputes = 0
+        self._broadcasts = 0
+        self._errors = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            # Nobody is listening: stop polling the DB, and forget the last
+            # sections so the next subscriber waits for a fresh poll
+            self._task.cancel()
+            self._task = None
+            self._ready = asyncio.Event()
+            self._encoded = {}
+            self._version = None
+
+    async def snapshot(self, timeout: float) -> Optional[bytes]:
+        """Full-dashboard event for a new subscriber, once the first poll has completed"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self._event(self._encoded)
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "version": self._version,
+            "polls": self._polls,
+            "recomputes": self._recomputes,
+            "broadcasts": self._broadcasts,
+            "errors": self._errors
+        }
+
+    def _event(self, sections: Dict[str, bytes]) -> bytes:
+        body = b",".join(orjson.dumps(name) + b":" + encoded for name, encoded in sections.items())
+        return b'{"version":' + orjson.dumps(self._version) + b',"sections":{' + body + b"}}"
+
+    async def _run(self):
+        while True:
+            try:
+                await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._errors += 1
+                print(f"Live dashboard poll error: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _poll(self):
+        self._polls += 1
+        view = snapshot_reader.current() if snapshot_enabled() else None
+        if view is not None:
+            # Another worker already did the DB work
+            version = f"{view.version}|{view.date}"
+            if version == self._version:
+                return
+            encoded = {name: view.section(name) for name in SECTIONS}
+        else:
+            version = f"{await run_db(load_data_version, read_only=True)}|{date.today().isoformat()}"
+            if version == self._version:
+                return
+            sections = await run_db(_load_sections, read_only=True)
+            encoded = {name: orjson.dumps(sections[name]) for name in SECTIONS}
+        self._recomputes += 1
+        changed = {name: data for name, data in encoded.items() if self._encoded.get(name) != data}
+        first = not self._encoded
+        self._encoded = encoded
+        self._version = version
+        self._ready.set()
+
+        if first or not changed:
+            return
+        self._broadcasts += 1
+        event = self._event(changed)
+        for queue in list(self._subscribers):
+            self._offer(queue, event)
+
+    def _offer(self, queue: asyncio.Queue, event: bytes):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind for deltas to be useful: replace the backlog with a full snapshot
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(self._event(self._encoded))
+
+dashboard_broadcaster = DashboardBroadcaster(interval=settings.LIVE_POLL_INTERVAL)
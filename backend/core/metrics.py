@@ -0,0 +1,178 @@
+"""
+Prometheus metrics for HTTP routes and DB queries
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence
+
+# Seconds; shared by request and query latency histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Metric:
+    """Base for label-keyed metrics whose cells are sharded per thread
+
+    Each thread only ever writes its own shard, so recording needs no lock;
+    a scrape sums the shards. Reads may be a few increments stale, which is
+    fine for monitoring.
+    """
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._shards: Dict[int, dict] = {}
+
+    def _shard(self) -> dict:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            shard = self._shards[ident] = {}
+        return shard
+
+    def _merged(self) -> Dict[tuple, list]:
+        merged: Dict[tuple, list] = {}
+        for shard in list(self._shards.values()):
+            for labels, cell in list(shard.items()):
+                total = merged.get(labels)
+                if total is None:
+                    merged[labels] = list(cell)
+                else:
+                    for i, v in enumerate(cell):
+                        total[i] += v
+        return merged
+
+    def _labels(self, labels: tuple, extra: str = "") -> str:
+        parts = [f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labels)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, cell in sorted(self._merged().items()):
+            lines.extend(self._samples(labels, cell))
+        return lines
+
+    def _samples(self, labels: tuple, cell: list) -> List[str]:
+        return [f"{self.name}{self._labels(labels)} {_num(cell[0])}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            cell = shard[labels] = [0]
+        cell[0] += amount
+
+class Gauge(Counter):
+    """Up/down counter (e.g. in-flight requests); shards are summed like a counter"""
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels: tuple, value: float):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            # One slot per bucket plus +Inf, then count and sum
+            cell = shard[labels] = [0] * (len(self.buckets) + 3)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-2] += 1
+        cell[-1] += value
+
+    def _samples(self, labels: tuple, cell: list) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), cell):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _num(bound)
+            bound_label = f'le="{le}"'
+            lines.append(f"{self.name}_bucket{self._labels(labels, bound_label)} {cumulative}")
+        lines.append(f"{self.name}_count{self._labels(labels)} {cell[-2]}")
+        lines.append(f"{self.name}_sum{self._labels(labels)} {_num(cell[-1])}")
+        return lines
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _num(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency until the last body chunk", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+db_acquire_latency = Histogram("db_pool_acquire_seconds", "Time to obtain a DB connection")
+db_query_latency = Histogram("db_query_duration_seconds", "DB query latency (execute plus fetch) by query label", ("query",))
+db_query_rows = Counter("db_query_rows_total", "Rows returned by query label", ("query",))
+db_query_errors = Counter("db_query_errors_total", "Failed DB queries by query label", ("query",))
+db_slow_queries = Counter("db_slow_queries_total", "Queries over SLOW_QUERY_THRESHOLD_MS by query label", ("query",))
+singleflight_calls = Counter(
+    "singleflight_calls_total", "Coalescable calls by group, loader and outcome (executed or coalesced)",
+    ("group", "loader", "outcome")
+)
+
+admission_requests = Counter(
+    "admission_requests_total", "DB admission decisions by endpoint class (admitted, queued, rejected, timed_out)",
+    ("class", "outcome")
+)
+
+REGISTRY = (
+    http_requests, http_latency, http_in_flight,
+    db_acquire_latency, db_query_latency, db_query_rows, db_query_errors, db_slow_queries,
+    singleflight_calls, admission_requests
+)
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status codes and in-flight requests
+
+    Routes are labelled by their path template (e.g. /api/projects/{project_id}/budget)
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            http_latency.observe((method, path), time.perf_counter() - start)
+            http_requests.inc((method, path, str(status[0])))
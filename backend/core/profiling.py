@@ -0,0 +1,412 @@
+"""
+Per-request profiling: phase breakdown (DB wait, row processing, serialization) plus stack sampling
+"""
+import asyncio
+import heapq
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import parse_qs
+import orjson
+from core.config import settings, BACKEND_DIR, REQUIRE_AUTH
+from core.security import verify_token
+
+# Seconds accumulated per phase; db_* and admission_wait together are the DB wait
+PHASES = ("admission_wait", "db_acquire", "db_query", "row_processing", "serialization")
+
+MAX_STACK_DEPTH = 64
+TOP_STACKS = 50
+TOP_FUNCTIONS = 25
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+# Query time inside the current run_db call, so it can be taken out of that call's row processing
+_work_query_time: ContextVar[Optional[list]] = ContextVar("profile_work_query_time", default=None)
+
+def profiles_dir() -> str:
+    return settings.PROFILING_DIR or str(BACKEND_DIR / "data" / "profiles")
+
+def record(phase: str, seconds: float):
+    """Add time to a phase of the request being profiled (no-op otherwise)"""
+    profile = current_profile.get()
+    if profile is None:
+        return
+    profile.add(phase, seconds)
+    if phase == "db_query":
+        work = _work_query_time.get()
+        if work is not None:
+            work[0] += seconds
+
+def run_work(func, conn, *args, **kwargs):
+    """Call func(conn, ...) (DB executor work), counting its non-query time as row processing"""
+    profile = current_profile.get()
+    if profile is None:
+        return func(conn, *args, **kwargs)
+
+    query_time = [0.0]
+    token = _work_query_time.set(query_time)
+    start = time.perf_counter()
+    try:
+        with profile.on_thread():
+            return func(conn, *args, **kwargs)
+    finally:
+        profile.add("row_processing", max(0.0, time.perf_counter() - start - query_time[0]))
+        _work_query_time.reset(token)
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def _stack(frame) -> Optional[tuple]:
+    """Innermost-last frame names, or None when the thread is idle in the event loop's selector"""
+    if os.path.basename(frame.f_code.co_filename) == "selectors.py":
+        return None
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return tuple(names)
+
+class RequestProfile:
+    """Phase timings and stack samples for one request"""
+
+    def __init__(self, method: str, path: str, query: str, trigger: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.query = query
+        self.trigger = trigger      # "request" (?profile=1 / X-Profile) or "sampled"
+        self.status = None
+        self.started_at = time.time()
+        self.duration = None
+        self.queries = 0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.samples: Counter = Counter()
+        self._start = time.perf_counter()
+        self._threads: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float):
+        # Executor threads and the event loop may add to the same profile
+        with self._lock:
+            self.phases[phase] += seconds
+            if phase == "db_query":
+                self.queries += 1
+
+    def add_sample(self, stack: tuple):
+        with self._lock:
+            self.samples[stack] += 1
+
+    @contextmanager
+    def on_thread(self):
+        """Sample the calling thread while inside the block"""
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[ident] -= 1
+                if not self._threads[ident]:
+                    del self._threads[ident]
+
+    def thread_ids(self) -> List[int]:
+        with self._lock:
+            return list(self._threads)
+
+    def elapsed(self) -> float:
+        return self.duration if self.duration is not None else time.perf_counter() - self._start
+
+    def finish(self, status: int):
+        self.status = status
+        self.duration = time.perf_counter() - self._start
+
+    def breakdown(self) -> dict:
+        """Milliseconds per phase; other = wall time not attributed to a phase"""
+        with self._lock:
+            phases = dict(self.phases)
+        total = self.elapsed()
+        db_wait = phases["admission_wait"] + phases["db_acquire"] + phases["db_query"]
+        result = {name: round(seconds * 1000, 3) for name, seconds in phases.items()}
+        result["db_wait"] = round(db_wait * 1000, 3)
+        # Parallel loads can overlap, so the attributed phases may exceed the wall time
+        other = total - db_wait - phases["row_processing"] - phases["serialization"]
+        result["other"] = round(max(0.0, other) * 1000, 3)
+        result["total"] = round(total * 1000, 3)
+        return result
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (durations in ms so far)"""
+        b = self.breakdown()
+        return ", ".join([
+            f"db;dur={b['db_wait']}",
+            f"rows;dur={b['row_processing']}",
+            f"serialize;dur={b['serialization']}",
+            f"total;dur={b['total']}"
+        ])
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "duration_ms": round(self.elapsed() * 1000, 3)
+        }
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stacks = Counter(self.samples)
+        samples = sum(stacks.values())
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                inclusive[name] += count
+        return {
+            **self.summary(),
+            "query": self.query,
+            "breakdown_ms": self.breakdown(),
+            "queries": self.queries,
+            "sample_interval_ms": settings.PROFILING_SAMPLE_INTERVAL_MS,
+            "samples": samples,
+            "top_functions": [
+                {"function": name, "self_samples": count, "total_samples": inclusive[name]}
+                for name, count in own.most_common(TOP_FUNCTIONS)
+            ],
+            # Collapsed stacks (root;...;leaf), the input format of flame graph tools
+            "stacks": [
+                {"stack": ";".join(stack), "samples": count}
+                for stack, count in stacks.most_common(TOP_STACKS)
+            ]
+        }
+
+class StackSampler:
+    """One daemon thread sampling the threads of every active profile every PROFILING_SAMPLE_INTERVAL_MS
+
+    The event loop thread is shared, so its samples can include other
+    requests' work interleaved with the profiled one.
+    """
+
+    def __init__(self):
+        self._profiles = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self):
+        interval = max(settings.PROFILING_SAMPLE_INTERVAL_MS, 1.0) / 1000
+        while True:
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                profiles = list(self._profiles)
+            frames = sys._current_frames()
+            for profile in profiles:
+                for ident in profile.thread_ids():
+                    frame = frames.get(ident)
+                    stack = _stack(frame) if frame is not None else None
+                    if stack:
+                        profile.add_sample(stack)
+            del frames
+            time.sleep(interval)
+
+class ProfileStore:
+    """Recent on-demand profiles in memory, plus the slowest sampled ones as JSON files on disk"""
+
+    def __init__(self):
+        self._recent: OrderedDict = OrderedDict()
+        self._slowest: list = []     # min-heap of (duration_ms, filename)
+        self._loaded = False
+        self._written = 0
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        return profiles_dir()
+
+    def keep(self, profile: RequestProfile):
+        with self._lock:
+            self._recent[profile.id] = profile
+            while len(self._recent) > settings.PROFILING_KEEP:
+                self._recent.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        """A kept or on-disk profile by id"""
+        with self._lock:
+            profile = self._recent.get(profile_id)
+        if profile is not None:
+            return profile.to_dict()
+        self._load()
+        for _, filename in list(self._slowest):
+            if filename.endswith(f"_{profile_id}.json"):
+                try:
+                    with open(os.path.join(self.directory, filename), "rb") as f:
+                        return orjson.loads(f.read())
+                except OSError:
+                    return None
+        return None
+
+    def _load(self):
+        """Rebuild the slowest-files heap from the directory (file names carry the duration)"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            for name in names:
+                # <duration_ms>ms_<YYYYmmddTHHMMSS>_<id>.json
+                head = name.split("ms_", 1)[0]
+                if name.endswith(".json") and head.isdigit():
+                    heapq.heappush(self._slowest, (int(head), name))
+
+    def offer(self, profile: RequestProfile) -> bool:
+        """Write a sampled profile if it is among the PROFILING_KEEP slowest; returns whether it was kept"""
+        self._load()
+        duration_ms = int(profile.elapsed() * 1000)
+        with self._lock:
+            if len(self._slowest) >= settings.PROFILING_KEEP and duration_ms <= self._slowest[0][0]:
+                return False
+            stamp = datetime.fromtimestamp(profile.started_at).strftime("%Y%m%dT%H%M%S")
+            filename = f"{duration_ms}ms_{stamp}_{profile.id}.json"
+            heapq.heappush(self._slowest, (duration_ms, filename))
+            evicted = []
+            while len(self._slowest) > settings.PROFILING_KEEP:
+                evicted.append(heapq.heappop(self._slowest)[1])
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, filename)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(orjson.dumps(profile.to_dict(), option=orjson.OPT_INDENT_2))
+            os.replace(tmp, path)
+            for name in evicted:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self._written += 1
+            return True
+        except OSError as e:
+            print(f"Failed to write profile {filename}: {e}")
+            return False
+
+    def stats(self) -> dict:
+        self._load()
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+            recent = [profile.summary() for profile in reversed(self._recent.values())]
+        return {
+            "enabled": settings.PROFILING_ENABLED,
+            "sample_rate": settings.PROFILING_SAMPLE_RATE,
+            "slow_threshold_ms": settings.PROFILING_SLOW_THRESHOLD_MS,
+            "directory": self.directory,
+            "written": self._written,
+            "recent": recent,
+            "slowest": [{"duration_ms": ms, "file": name} for ms, name in slowest]
+        }
+
+stack_sampler = StackSampler()
+profile_store = ProfileStore()
+
+def _profile_requested(scope) -> bool:
+    params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if params.get("profile", [""])[-1] in ("1", "true"):
+        return True
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile":
+            return value.strip() in (b"1", b"true")
+    return False
+
+def _authorized(scope) -> bool:
+    """Same rule as get_current_user: a valid service token when auth is required"""
+    if not REQUIRE_AUTH:
+        return True
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return False
+            payload = verify_token(token.strip())
+            return payload is not None and payload.get("type") == "service_token"
+    return False
+
+class ProfilingMiddleware:
+    """Profiles requests that ask for it (?profile=1 or X-Profile: 1) and a PROFILING_SAMPLE_RATE sample of the rest
+
+    On-demand profiles get Server-Timing and X-Profile-Id response headers
+    and are kept for GET /api/system/profiles/{id}. Sampled profiles slower
+    than PROFILING_SLOW_THRESHOLD_MS are offered to the on-disk slowest set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if _profile_requested(scope) and _authorized(scope):
+            trigger = "request"
+        elif settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+            trigger = "sampled"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(
+            scope.get("method", ""), scope.get("path", ""), scope.get("query_string", b"").decode("latin-1"), trigger
+        )
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if trigger == "request":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", profile.server_timing().encode("latin-1")))
+                    headers.append((b"x-profile-id", profile.id.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        token = current_profile.set(profile)
+        stack_sampler.add(profile)
+        try:
+            with profile.on_thread():
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            stack_sampler.remove(profile)
+            current_profile.reset(token)
+            profile.finish(status[0])
+            if trigger == "request":
+                profile_store.keep(profile)
+            elif profile.duration * 1000 >= settings.PROFILING_SLOW_THRESHOLD_MS:
+                await asyncio.get_running_loop().run_in_executor(None, profile_store.offer, profile)
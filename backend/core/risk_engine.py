@@ -0,0 +1,123 @@
+"""
+Vectorized risk scoring over a columnar per-project snapshot
+"""
+from datetime import date
+from typing import List, NamedTuple
+import numpy as np
+
+class RiskRules(NamedTuple):
+    """Thresholds and weights for one scoring pass (defaults match GET /api/projects/risks)"""
+    variance_pct: float = 10.0          # over-budget alert above this variance %
+    overdue_days: int = 0               # overdue alert above this many days late
+    high_variance_pct: float = 20.0     # high risk above this variance %
+    high_overdue_days: int = 7          # high risk above this many days late
+    overdue_weight: float = 1.0
+    variance_weight: float = 1.0
+
+class RiskFrame(NamedTuple):
+    """Per-project schedule and budget columns, index-aligned"""
+    project_id: np.ndarray      # int64
+    end_ordinal: np.ndarray     # int64, date.toordinal(); only meaningful where has_end
+    has_end: np.ndarray         # bool
+    is_open: np.ndarray         # bool, status not NULL and != 0
+    allocated: np.ndarray       # float64
+    burnt: np.ndarray           # float64
+    project_name: list
+    client_name: list
+    manager_name: list
+
+    def __len__(self) -> int:
+        return len(self.project_id)
+
+def build_risk_frame(dataset: dict) -> RiskFrame:
+    """Columnar form of a core.analytics dataset"""
+    projects = dataset['projects']
+    budgets = dataset['budgets']
+    n = len(projects)
+    totals = [budgets.get(p['project_id']) for p in projects]
+    return RiskFrame(
+        project_id=np.fromiter((p['project_id'] for p in projects), dtype=np.int64, count=n),
+        end_ordinal=np.fromiter(
+            (p['end_date'].toordinal() if p['end_date'] is not None else 0 for p in projects),
+            dtype=np.int64, count=n
+        ),
+        has_end=np.fromiter((p['end_date'] is not None for p in projects), dtype=bool, count=n),
+        is_open=np.fromiter((p['status'] is not None and p['status'] != 0 for p in projects), dtype=bool, count=n),
+        allocated=np.fromiter((t['total_allocated'] if t else 0.0 for t in totals), dtype=np.float64, count=n),
+        burnt=np.fromiter((t['total_burnt'] if t else 0.0 for t in totals), dtype=np.float64, count=n),
+        project_name=[p['project_name'] for p in projects],
+        client_name=[p['client_name'] or 'N/A' for p in projects],
+        manager_name=[p['manager_name'] or 'N/A' for p in projects]
+    )
+
+def score_risks(frame: RiskFrame, today: date, rules: RiskRules = RiskRules(), order_by: str = "overdue") -> List[dict]:
+    """Score every project in one pass and return the flagged ones
+
+    order_by="overdue" sorts like GET /api/projects/risks (days overdue, then
+    variance); order_by="score" sorts by the weighted risk_score.
+    """
+    if not len(frame):
+        return []
+
+    days_overdue = np.where(
+        frame.is_open & frame.has_end & (frame.end_ordinal < today.toordinal()),
+        today.toordinal() - frame.end_ordinal,
+        0
+    )
+    positive = frame.allocated > 0
+    variance = np.zeros_like(frame.allocated)
+    np.divide(frame.burnt - frame.allocated, frame.allocated, out=variance, where=positive)
+    variance *= 100
+
+    overdue_alert = days_overdue > rules.overdue_days
+    variance_alert = variance > rules.variance_pct
+    flagged = np.flatnonzero(overdue_alert | variance_alert)
+    if not flagged.size:
+        return []
+
+    high = (days_overdue > rules.high_overdue_days) | (variance > rules.high_variance_pct)
+    score = (
+        rules.overdue_weight * days_overdue / max(rules.high_overdue_days, 1)
+        + rules.variance_weight * np.maximum(variance, 0) / max(rules.high_variance_pct, 1e-9)
+    )
+
+    # Stable descending sorts, so ties keep dataset order like the list-based endpoint
+    if order_by == "score":
+        flagged = flagged[np.argsort(-score[flagged], kind="stable")]
+    else:
+        flagged = flagged[np.lexsort((-variance[flagged], -days_overdue[flagged]))]
+
+    # Pull the flagged rows out as Python scalars once instead of indexing arrays per field
+    days_col = days_overdue[flagged].tolist()
+    variance_col = variance[flagged].tolist()
+    overdue_col = overdue_alert[flagged].tolist()
+    over_budget_col = variance_alert[flagged].tolist()
+    high_col = high[flagged].tolist()
+    score_col = np.round(score[flagged], 4).tolist()
+    id_col = frame.project_id[flagged].tolist()
+    allocated_col = frame.allocated[flagged].tolist()
+    burnt_col = frame.burnt[flagged].tolist()
+
+    alerts = []
+    for row, i in enumerate(flagged.tolist()):
+        days = days_col[row]
+        pct = variance_col[row]
+        messages = []
+        if overdue_col[row]:
+            messages.append(f"Project is {days} days overdue")
+        if over_budget_col[row]:
+            messages.append(f"Project is {pct:.1f}% over budget")
+        alerts.append({
+            'project_id': id_col[row],
+            'project_name': frame.project_name[i],
+            'client_name': frame.client_name[i],
+            'manager_name': frame.manager_name[i],
+            'days_overdue': days,
+            'budget_variance_pct': pct,
+            'allocated_amount': allocated_col[row],
+            'burnt_amount': burnt_col[row],
+            'alerts': messages,
+            'risk_level': 'high' if high_col[row] else 'medium',
+            'risk_score': score_col[row]
+        })
+    return alerts
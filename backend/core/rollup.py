@@ -0,0 +1,256 @@
+"""
+Incrementally maintained per-project budget totals
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Optional
+from core.config import settings
+from core.database import run_db, fetch_all, fetch_one, iter_batches
+
+BUDGET_ROWS_QUERY = """
+    SELECT budget_id, project_id, allocated_amount, burnt_amount, remaining_amount, updated_at
+    FROM budgets
+"""
+
+_ZERO = Decimal(0)
+
+def _dec(value) -> Decimal:
+    if value is None:
+        return _ZERO
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+def _contribution(row: dict) -> tuple:
+    """(project_id, allocated, burnt, remaining, variance_pct) for one budget row"""
+    allocated = _dec(row['allocated_amount'])
+    burnt = _dec(row['burnt_amount'])
+    variance = ((burnt - allocated) / allocated) * 100 if allocated > 0 else _ZERO
+    return (row['project_id'], allocated, burnt, _dec(row['remaining_amount']), variance)
+
+class BudgetRollup:
+    """Per-project budget sums kept in memory and refreshed from an updated_at watermark
+
+    Totals are kept as exact Decimal sums so repeated add/subtract does not
+    drift; readers get float views shaped like core.analytics.load_budget_totals.
+    Deleted budgets (and ones inserted without updated_at) are only noticed
+    by a full rebuild: readers rebuild when the budgets count last seen by
+    the data version probe differs from the rollup's.
+
+    No lock is held across DB I/O: refreshes query concurrently and only
+    take _lock to apply their rows, and a rebuild scans without blocking
+    readers and swaps its result in at the end. Each refresh or rebuild
+    takes an epoch before querying; a refresh whose rows are older than ones
+    already applied is dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._budgets: Dict[int, tuple] = {}
+        self._sums: Dict[int, list] = {}
+        self._views: Dict[int, dict] = {}
+        self._watermark = None
+        self._ready = False
+        self._next_epoch = 0
+        self._applied_epoch = -1
+        # (budgets row count, epoch when seen) from the last data version probe
+        self._observed_count: Optional[tuple] = None
+
+        self._rebuilds = 0
+        self._refreshes = 0
+        self._stale_refreshes = 0
+        self._rows_applied = 0
+        self._last_rebuild_at: Optional[float] = None
+        self._last_refresh_at: Optional[float] = None
+        self._last_rebuild_ms = 0.0
+        self._last_refresh_ms = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def rebuild(self, conn, batch_size: int = 5000, wait: bool = True) -> bool:
+        """Recompute every project's totals from a full scan of budgets
+
+        Only one rebuild runs at a time; with wait=False, returns False
+        instead of waiting for one already in progress.
+        """
+        if not self._rebuild_lock.acquire(blocking=wait):
+            return False
+        try:
+            start = time.monotonic()
+            with self._lock:
+                epoch = self._next_epoch
+                self._next_epoch += 1
+            budgets, sums = {}, {}
+            watermark = None
+            for rows in iter_batches(conn, BUDGET_ROWS_QUERY, batch_size=batch_size, label="rollup_rebuild"):
+                for row in rows:
+                    contribution = _contribution(row)
+                    budgets[row['budget_id']] = contribution
+                    _add(sums, contribution, 1)
+                    if row['updated_at'] is not None and (watermark is None or row['updated_at'] > watermark):
+                        watermark = row['updated_at']
+
+            views = {project_id: _view(s) for project_id, s in sums.items()}
+            with self._lock:
+                # Refreshes that applied meanwhile are re-read by the next refresh (watermark overlap)
+                self._budgets, self._sums, self._views = budgets, sums, views
+                self._watermark = watermark
+                self._applied_epoch = max(self._applied_epoch, epoch)
+                if self._observed_count is not None and self._observed_count[1] <= epoch:
+                    # Seen before this scan started, so the scan already reflects it
+                    self._observed_count = None
+                self._ready = True
+                self._rebuilds += 1
+                self._last_rebuild_at = time.time()
+                self._last_rebuild_ms = (time.monotonic() - start) * 1000
+            return True
+        finally:
+            self._rebuild_lock.release()
+
+    def refresh(self, conn) -> int:
+        """Apply budget rows changed since the watermark; returns the number of changed rows"""
+        if not self._ready:
+            self.rebuild(conn)
+            return len(self._budgets)
+
+        start = time.monotonic()
+        with self._lock:
+            epoch = self._next_epoch
+            self._next_epoch += 1
+            watermark = self._watermark
+        if watermark is None:
+            rows = fetch_all(conn, BUDGET_ROWS_QUERY + " WHERE updated_at IS NOT NULL", label="rollup_refresh")
+        else:
+            # Re-read a window before the watermark so late-committing rows are not missed;
+            # re-applying an unchanged row is a no-op
+            since = watermark
+            if isinstance(since, datetime):
+                since -= timedelta(seconds=settings.ROLLUP_WATERMARK_OVERLAP)
+            rows = fetch_all(conn, BUDGET_ROWS_QUERY + " WHERE updated_at >= %s", (since,), label="rollup_refresh")
+
+        with self._lock:
+            if epoch < self._applied_epoch:
+                # A refresh or rebuild that queried later has already applied newer rows
+                self._stale_refreshes += 1
+                return 0
+            self._applied_epoch = epoch
+
+            touched = set()
+            applied = 0
+            for row in rows:
+                contribution = _contribution(row)
+                previous = self._budgets.get(row['budget_id'])
+                if previous == contribution:
+                    continue
+                applied += 1
+                if previous is not None:
+                    _add(self._sums, previous, -1)
+                    touched.add(previous[0])
+                _add(self._sums, contribution, 1)
+                touched.add(contribution[0])
+                self._budgets[row['budget_id']] = contribution
+                if row['updated_at'] is not None and (self._watermark is None or row['updated_at'] > self._watermark):
+                    self._watermark = row['updated_at']
+
+            for project_id in touched:
+                sums = self._sums.get(project_id)
+                if sums is None or sums[4] <= 0:
+                    self._sums.pop(project_id, None)
+                    self._views.pop(project_id, None)
+                else:
+                    self._views[project_id] = _view(sums)
+
+            self._refreshes += 1
+            self._rows_applied += applied
+            self._last_refresh_at = time.time()
+            self._last_refresh_ms = (time.monotonic() - start) * 1000
+        return applied
+
+    def observe_budget_count(self, count: int):
+        """Record the budgets row count a data version probe just read"""
+        with self._lock:
+            self._observed_count = (count, self._next_epoch)
+
+    def count_mismatch(self) -> bool:
+        """True if the last observed budgets count differs from the rollup's (rows deleted or missed)"""
+        with self._lock:
+            return self._observed_count is not None and self._observed_count[0] != len(self._budgets)
+
+    def budget_count_matches(self, conn) -> bool:
+        """False if rows were inserted without updated_at or deleted since the last rebuild"""
+        row = fetch_one(conn, "SELECT COUNT(*) as budget_count FROM budgets", label="rollup_count")
+        return int(row['budget_count']) == len(self._budgets)
+
+    def totals(self, project_ids=None) -> Dict[int, dict]:
+        """Snapshot of per-project totals (optionally only for project_ids)"""
+        with self._lock:
+            if project_ids is None:
+                return dict(self._views)
+            return {pid: self._views[pid] for pid in project_ids if pid in self._views}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self._ready,
+                "projects": len(self._views),
+                "budgets": len(self._budgets),
+                "watermark": str(self._watermark) if self._watermark is not None else None,
+                "rebuilds": self._rebuilds,
+                "refreshes": self._refreshes,
+                "stale_refreshes": self._stale_refreshes,
+                "rows_applied": self._rows_applied,
+                "last_rebuild_at": self._last_rebuild_at,
+                "last_rebuild_ms": round(self._last_rebuild_ms, 3),
+                "last_refresh_at": self._last_refresh_at,
+                "last_refresh_ms": round(self._last_refresh_ms, 3)
+            }
+
+def _add(sums: Dict[int, list], contribution: tuple, sign: int):
+    project_id, allocated, burnt, remaining, variance = contribution
+    s = sums.get(project_id)
+    if s is None:
+        s = sums[project_id] = [_ZERO, _ZERO, _ZERO, _ZERO, 0]
+    s[0] += sign * allocated
+    s[1] += sign * burnt
+    s[2] += sign * remaining
+    s[3] += sign * variance
+    s[4] += sign
+
+def _view(s: list) -> dict:
+    return {
+        'total_allocated': float(s[0]),
+        'total_burnt': float(s[1]),
+        'total_remaining': float(s[2]),
+        'variance_sum': float(s[3]),
+        'budget_rows': s[4]
+    }
+
+budget_rollup = BudgetRollup()
+
+def refresh_or_rebuild(conn):
+    """Apply deltas, then rebuild if the budgets count shows rows the deltas cannot see (deletes)"""
+    budget_rollup.refresh(conn)
+    if not budget_rollup.budget_count_matches(conn):
+        budget_rollup.rebuild(conn)
+
+async def refresh_periodically():
+    """Background task: build the rollup, then apply deltas and rebuild on a schedule"""
+    last_rebuild = None
+    while True:
+        try:
+            if last_rebuild is None or time.monotonic() - last_rebuild >= settings.ROLLUP_REBUILD_INTERVAL:
+                await run_db(budget_rollup.rebuild, read_only=True)
+                last_rebuild = time.monotonic()
+            else:
+                await run_db(refresh_or_rebuild, read_only=True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Budget rollup refresh error: {e}")
+        await asyncio.sleep(settings.ROLLUP_REFRESH_INTERVAL)
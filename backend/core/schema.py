@@ -0,0 +1,78 @@
+"""
+Indexes the analytics queries rely on, and helpers to check/create them
+"""
+from typing import Dict, List, NamedTuple, Tuple
+from core.database import fetch_all
+
+class IndexSpec(NamedTuple):
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+    reason: str
+
+REQUIRED_INDEXES = (
+    IndexSpec("budgets", "idx_budgets_project_amounts",
+              ("project_id", "allocated_amount", "burnt_amount", "remaining_amount"),
+              "budget totals GROUP BY project_id and per-project lookups, answered from the index alone"),
+    IndexSpec("budgets", "idx_budgets_updated_at", ("updated_at",),
+              "rollup refresh watermark scan and MAX(updated_at) in the data version probe"),
+    IndexSpec("projects", "idx_projects_status_end_date", ("status", "end_date"),
+              "summary counts and status/status_category filters"),
+    IndexSpec("projects", "idx_projects_end_date", ("end_date",),
+              "date_from filter and sort=end_date"),
+    IndexSpec("projects", "idx_projects_start_date", ("start_date",),
+              "date_to filter, sort=start_date and timeline ordering"),
+    IndexSpec("projects", "idx_projects_manager", ("project_manager",),
+              "project_manager filter, sort and employees join"),
+    IndexSpec("projects", "idx_projects_client", ("client_id",),
+              "client_id filter, sort and clients join"),
+    IndexSpec("projects", "idx_projects_name", ("project_name",),
+              "sort=project_name"),
+    IndexSpec("projects", "idx_projects_updated_at", ("updated_at",),
+              "sort=updated_at and MAX(updated_at) in the data version probe"),
+)
+
+INDEX_COLUMNS_QUERY = """
+    SELECT table_name, index_name, column_name, seq_in_index
+    FROM information_schema.STATISTICS
+    WHERE table_schema = DATABASE() AND table_name IN ('projects', 'budgets')
+    ORDER BY table_name, index_name, seq_in_index
+"""
+
+def existing_indexes(conn) -> Dict[str, List[Tuple[str, ...]]]:
+    """Column lists of every index on projects/budgets, keyed by table"""
+    indexes: Dict[Tuple[str, str], List[str]] = {}
+    for row in fetch_all(conn, INDEX_COLUMNS_QUERY, label="schema_indexes"):
+        # information_schema column case differs between MySQL versions
+        row = {k.lower(): v for k, v in row.items()}
+        indexes.setdefault((row['table_name'], row['index_name']), []).append(row['column_name'].lower())
+
+    by_table: Dict[str, List[Tuple[str, ...]]] = {}
+    for (table, _), columns in indexes.items():
+        by_table.setdefault(table, []).append(tuple(columns))
+    return by_table
+
+def missing_indexes(conn) -> List[IndexSpec]:
+    """Required indexes not already covered by an index with the same leading columns"""
+    existing = existing_indexes(conn)
+    missing = []
+    for spec in REQUIRED_INDEXES:
+        covered = any(
+            columns[:len(spec.columns)] == spec.columns
+            for columns in existing.get(spec.table, [])
+        )
+        if not covered:
+            missing.append(spec)
+    return missing
+
+def create_index_sql(spec: IndexSpec) -> str:
+    # Online DDL: reads and writes continue while the index builds
+    columns = ", ".join(f"`{c}`" for c in spec.columns)
+    return f"CREATE INDEX `{spec.name}` ON `{spec.table}` ({columns}) ALGORITHM=INPLACE LOCK=NONE"
+
+def create_index(conn, spec: IndexSpec):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(create_index_sql(spec))
+    finally:
+        cursor.close()
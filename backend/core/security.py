@@ -1,10 +1,19 @@
 """
 JWT token utilities
 """
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from core.config import settings
+from core.cache import TTLCache
+
+# Verified payloads keyed by token digest, each kept until the token's own exp
+token_cache = TTLCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    ttl=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
@@ -21,10 +30,27 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
 def verify_token(token: str) -> Optional[dict]:
-    """Verify and decode a JWT token"""
+    """Verify and decode a JWT token (repeat tokens are served from token_cache)"""
     if not settings.JWT_SECRET_KEY:
         return None
 
+    if not settings.TOKEN_CACHE_ENABLED:
+        return _decode(token)
+
+    key = hashlib.sha256(token.encode()).digest()
+    hit, payload = token_cache.get(key)
+    if hit:
+        return dict(payload)
+
+    payload = _decode(token)
+    if payload is not None and isinstance(payload.get("exp"), (int, float)):
+        ttl = payload["exp"] - time.time()
+        if ttl > 0:
+            token_cache.set(key, payload, ttl=ttl)
+        return dict(payload)
+    return payload
+
+def _decode(token: str) -> Optional[dict]:
     try:
         return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
     except JWTError:
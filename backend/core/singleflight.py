@@ -0,0 +1,56 @@
+"""
+Single-flight coalescing: concurrent identical calls share one execution
+"""
+import asyncio
+from typing import Dict, Hashable
+from core.metrics import singleflight_calls
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers arriving meanwhile await the same result
+
+    The call runs as its own task, so a caller that disconnects (is
+    cancelled) does not cancel the work the other callers are waiting on.
+    Nothing is cached once the call finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._executed = 0
+        self._coalesced = 0
+        self._errors = 0
+
+    async def do(self, key: Hashable, label: str, func, *args, **kwargs):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self._executed += 1
+            singleflight_calls.inc((self.name, label, "executed"))
+        else:
+            self._coalesced += 1
+            singleflight_calls.inc((self.name, label, "coalesced"))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Retrieve the exception so it is not reported as unhandled when every caller went away
+        if not task.cancelled() and task.exception() is not None:
+            self._errors += 1
+
+    def stats(self) -> dict:
+        calls = self._executed + self._coalesced
+        return {
+            "executed": self._executed,
+            "coalesced": self._coalesced,
+            "coalesced_rate": round(self._coalesced / calls, 4) if calls else 0.0,
+            "in_flight": len(self._in_flight),
+            "errors": self._errors
+        }
+
+# Loader calls behind the analytics endpoints, keyed by loader and arguments
+query_flight = SingleFlight("analytics_query")
+# Serialization/compression of one response body, keyed by endpoint, ETag and encoding
+encode_flight = SingleFlight("encoded_body")
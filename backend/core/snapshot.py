@@ -0,0 +1,239 @@
+"""
+Cross-worker analytics snapshot: one worker builds it, every worker serves it from a memory-mapped file
+
+File layout: MAGIC, a 4-byte header length, a JSON header
+({"version", "date", "built_at", "sections": {name: [offset, length]}}),
+then each section's pre-encoded JSON back to back. The file is replaced
+atomically, so readers always map a complete snapshot.
+"""
+import asyncio
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional
+import orjson
+from core.config import settings
+from core.database import run_db, get_executor
+from core.analytics import SECTIONS, load_dataset, load_data_version, build_dashboard
+from core.rollup import refresh_or_rebuild
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every worker builds its own snapshot
+    fcntl = None
+
+MAGIC = b"PXSNAP01"
+_LENGTH = struct.Struct("<I")
+
+def snapshot_enabled() -> bool:
+    return settings.SNAPSHOT_ENABLED or settings.WORKERS > 1
+
+def snapshot_path() -> str:
+    return settings.SNAPSHOT_PATH or os.path.join(tempfile.gettempdir(), "projex-analytics.snapshot")
+
+def write_snapshot(path: str, version: str, day: date, sections: Dict[str, bytes]):
+    """Write sections to path atomically (temp file, fsync, rename)"""
+    offsets, position = {}, 0
+    for name, data in sections.items():
+        offsets[name] = [position, len(data)]
+        position += len(data)
+    header = orjson.dumps({
+        "version": version,
+        "date": day.isoformat(),
+        "built_at": time.time(),
+        "sections": offsets
+    })
+    # Offsets in the header are relative to the end of the header
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        for data in sections.values():
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class SnapshotView:
+    """One mapped snapshot file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError("not a snapshot file")
+        (length,) = _LENGTH.unpack_from(self._map, len(MAGIC))
+        start = len(MAGIC) + _LENGTH.size
+        header = orjson.loads(self._map[start:start + length])
+        self._base = start + length
+        self.version: str = header["version"]
+        self.date: str = header["date"]
+        self.built_at: float = header["built_at"]
+        self._sections: Dict[str, list] = header["sections"]
+
+    def section(self, name: str) -> Optional[bytes]:
+        """Encoded JSON for one section (copied out of the map, never parsed)"""
+        location = self._sections.get(name)
+        if location is None:
+            return None
+        offset, length = location
+        return self._map[self._base + offset:self._base + offset + length]
+
+    def close(self):
+        self._map.close()
+
+class SnapshotReader:
+    """Maps the newest snapshot file, remapping when the publisher replaces it"""
+
+    def __init__(self, path: str, max_age: float):
+        self.path = path
+        self.max_age = max_age
+        self._view: Optional[SnapshotView] = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._remaps = 0
+
+    def current(self) -> Optional[SnapshotView]:
+        """The mapped snapshot if it is fresh and built today, else None (callers fall back to the DB)"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._misses += 1
+            return None
+
+        view = self._view
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if view is None or view.identity != identity:
+            with self._lock:
+                view = self._view
+                if view is None or view.identity != identity:
+                    try:
+                        view = SnapshotView(self.path)
+                    except (OSError, ValueError) as e:
+                        print(f"Snapshot read error: {e}")
+                        self._misses += 1
+                        return None
+                    # Slices already handed out are copies, so the old map can go
+                    old, self._view = self._view, view
+                    if old is not None:
+                        old.close()
+                    self._remaps += 1
+
+        if view.date != date.today().isoformat() or time.time() - view.built_at > self.max_age:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return view
+
+    def stats(self) -> dict:
+        view = self._view
+        return {
+            "path": self.path,
+            "version": view.version if view else None,
+            "built_at": view.built_at if view else None,
+            "hits": self._hits,
+            "misses": self._misses,
+            "remaps": self._remaps
+        }
+
+def _load_sections(conn) -> tuple:
+    if settings.ROLLUP_ENABLED:
+        # Every worker serves these sections, so deleted budgets must be out of the totals first
+        refresh_or_rebuild(conn)
+    version = load_data_version(conn)
+    return version, build_dashboard(load_dataset(conn), date.today())
+
+class SnapshotPublisher:
+    """Whichever worker holds the flock rebuilds the snapshot; the rest only read it"""
+
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self._lock_file = None
+        self._encoded: Dict[str, bytes] = {}
+        self._state = None
+        self._written_at = 0.0
+        self._builds = 0
+        self._writes = 0
+        self._errors = 0
+
+    @property
+    def leader(self) -> bool:
+        return self._lock_file is not None
+
+    def _try_lead(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            self._lock_file = True
+            return True
+        lock_file = open(self.path + ".lock", "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        print(f"Worker {os.getpid()} is the analytics snapshot publisher")
+        return True
+
+    async def publish_once(self):
+        version = await run_db(load_data_version, read_only=True)
+        today = date.today()
+        if (version, today) != self._state or not os.path.exists(self.path):
+            version, sections = await run_db(_load_sections, read_only=True)
+            self._encoded = {name: orjson.dumps(sections[name]) for name in SECTIONS}
+            self._state = (version, today)
+            self._builds += 1
+        elif time.time() - self._written_at < self.interval * 3:
+            return
+        # Rewritten unchanged as a heartbeat, so readers can tell a live publisher from a dead one
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(get_executor(), write_snapshot, self.path, self._state[0], today, self._encoded)
+        self._written_at = time.time()
+        self._writes += 1
+
+    async def run(self):
+        """Background task: contend for leadership, and while leading keep the snapshot current"""
+        while True:
+            try:
+                if self._try_lead():
+                    await self.publish_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._errors += 1
+                print(f"Snapshot publish error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def close(self):
+        lock_file, self._lock_file = self._lock_file, None
+        if lock_file not in (None, True):
+            lock_file.close()
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "leader": self.leader,
+            "builds": self._builds,
+            "writes": self._writes,
+            "errors": self._errors
+        }
+
+snapshot_reader = SnapshotReader(snapshot_path(), max_age=settings.SNAPSHOT_MAX_AGE)
+snapshot_publisher = SnapshotPublisher(snapshot_path(), interval=settings.SNAPSHOT_REFRESH_INTERVAL)
+
+def snapshot_stats() -> dict:
+    """Snapshot state for the status endpoint"""
+    if not snapshot_enabled():
+        return {"enabled": False}
+    return {"enabled": True, "publisher": snapshot_publisher.stats(), "reader": snapshot_reader.stats()}
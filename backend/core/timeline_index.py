@@ -0,0 +1,68 @@
+"""
+Interval index over timeline rows for date-window (Gantt viewport) queries
+"""
+from bisect import bisect_right
+from datetime import date
+from typing import List, Optional
+
+# Open-ended bounds: a missing start/end date never limits overlap
+_UNBOUNDED_START = date.min.toordinal()
+_UNBOUNDED_END = date.max.toordinal()
+
+def _ordinal(value: Optional[str], missing: int) -> int:
+    return date.fromisoformat(value).toordinal() if value else missing
+
+class TimelineIndex:
+    """Rows sorted by start plus a max-end segment tree over that order
+
+    A window [date_from, date_to] overlaps a row when start <= date_to and
+    end >= date_from. Rows passing the first test are a prefix of the start
+    order (binary search); the tree prunes every subtree whose latest end is
+    before date_from, so a query costs O(log n) per returned row at worst and
+    results come back in timeline order.
+    """
+
+    def __init__(self, rows: List[dict]):
+        # build_timeline already orders by start (undated first); keep that order
+        self.rows = rows
+        self._starts = [_ordinal(row['start'], _UNBOUNDED_START) for row in rows]
+        ends = [_ordinal(row['end'], _UNBOUNDED_END) for row in rows]
+
+        size = 1
+        while size < max(len(rows), 1):
+            size *= 2
+        tree = [_UNBOUNDED_START - 1] * (2 * size)
+        tree[size:size + len(ends)] = ends
+        for node in range(size - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self._size = size
+        self._tree = tree
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def overlapping(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[dict]:
+        """Rows whose [start, end] overlaps the window, in timeline order"""
+        if date_to is None:
+            limit = len(self.rows)
+        else:
+            limit = bisect_right(self._starts, date_to.toordinal())
+        min_end = date_from.toordinal() if date_from is not None else _UNBOUNDED_START
+        if limit == 0:
+            return []
+
+        tree, rows, size = self._tree, self.rows, self._size
+        result = []
+        # Depth-first, left child on top, over nodes that cover part of [0, limit)
+        stack = [(1, 0, size)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if lo >= limit or tree[node] < min_end:
+                continue
+            if node >= size:
+                result.append(rows[lo])
+                continue
+            mid = (lo + hi) // 2
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+        return result
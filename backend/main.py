@@ -1,17 +1,55 @@
 """
 FastAPI app entry point
 """
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from core.config import settings
-from api import project_analytics, auth
+from core.database import init_pool, close_pool, shutdown_executor, check_replicas_periodically
+from core.rollup import refresh_periodically
+from core.burn_history import capture_periodically
+from core.live import dashboard_broadcaster
+from core.snapshot import snapshot_enabled, snapshot_publisher
+from core.metrics import MetricsMiddleware, render_metrics
+from core.compression import CompressionMiddleware
+from core.profiling import ProfilingMiddleware
+from api import project_analytics, project_burn, project_export, project_stream, auth, system
+from api.responses import FastJSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_pool()
+    tasks = []
+    if snapshot_enabled():
+        # Only the publishing worker queries for the shared sections
+        tasks.append(asyncio.create_task(snapshot_publisher.run()))
+    if settings.ROLLUP_ENABLED:
+        # Every worker keeps its own rollup (lists, project budgets), so each runs the
+        # count check and periodic rebuild that pick up deleted budgets
+        tasks.append(asyncio.create_task(refresh_periodically()))
+    if settings.BURN_HISTORY_ENABLED:
+        tasks.append(asyncio.create_task(capture_periodically()))
+    if settings.DB_REPLICA_URLS:
+        tasks.append(asyncio.create_task(check_replicas_periodically()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await dashboard_broadcaster.stop()
+    snapshot_publisher.close()
+    shutdown_executor()
+    close_pool()
 
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="REST APIs for Project Analytics",
     docs_url="/docs" if settings.DEBUG else None,
-    redoc_url="/redoc" if settings.DEBUG else None
+    redoc_url="/redoc" if settings.DEBUG else None,
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -22,8 +60,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Outside compression, so compressing a profiled response counts as serialization
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(project_analytics.router)
+app.include_router(project_burn.router)
+app.include_router(project_export.router)
+app.include_router(project_stream.router)
 app.include_router(auth.router)
+app.include_router(system.router)
 
 @app.get("/")
 async def root():
@@ -35,6 +87,11 @@ async def root():
         "docs": "/docs" if settings.DEBUG else "disabled"
     }
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     print(f"Starting {settings.APP_NAME}...")
@@ -42,7 +99,10 @@ if __name__ == "__main__":
     print(f"Auth: {'Required' if settings.ENVIRONMENT.lower() == 'prod' else 'Disabled'}")
     print(f"Docs: http://localhost:{settings.PORT}/docs")
     
-    if settings.DEBUG:
+    if settings.WORKERS > 1:
+        print(f"Workers: {settings.WORKERS} (shared snapshot)")
+        uvicorn.run("main:app", host=settings.HOST, port=settings.PORT, workers=settings.WORKERS)
+    elif settings.DEBUG:
         uvicorn.run("main:app", host=settings.HOST, port=settings.PORT, reload=True)
     else:
         uvicorn.run(app, host=settings.HOST, port=settings.PORT, reload=False)
@@ -0,0 +1,108 @@
+"""
+Management commands
+
+    python manage.py ensure-indexes [--dry-run]
+    python manage.py capture-burn
+    python manage.py export --format {arrow,parquet} [--output PATH]
+"""
+import argparse
+import sys
+from datetime import date
+from core.config import settings
+from core.database import get_db_connection
+from core.schema import REQUIRED_INDEXES, missing_indexes, create_index, create_index_sql
+from core.burn_history import burn_history
+from core.arrow_export import arrow_available, write_export
+
+def ensure_indexes(dry_run: bool) -> int:
+    """Create any required index that is missing; returns a process exit code"""
+    conn = get_db_connection()
+    if not conn:
+        print("Database unavailable.")
+        return 1
+
+    try:
+        missing = missing_indexes(conn)
+        print(f"{len(REQUIRED_INDEXES) - len(missing)}/{len(REQUIRED_INDEXES)} required indexes present")
+        for spec in missing:
+            print(f"  missing {spec.table}({', '.join(spec.columns)}) - {spec.reason}")
+            print(f"    {create_index_sql(spec)}")
+
+        if dry_run or not missing:
+            return 1 if missing and dry_run else 0
+
+        for spec in missing:
+            print(f"Creating {spec.name}...")
+            create_index(conn, spec)
+        print(f"Created {len(missing)} index(es)")
+        return 0
+    except Exception as e:
+        print(f"Failed to ensure indexes: {e}")
+        return 1
+    finally:
+        conn.close()
+
+def capture_burn() -> int:
+    """Write today's burn snapshot and thin out old days (for cron when the server's job is off)"""
+    conn = get_db_connection()
+    if not conn:
+        print("Database unavailable.")
+        return 1
+
+    try:
+        rows = burn_history.capture(conn)
+        print(f"Captured {rows} budget rows to {burn_history.path(date.today())}")
+        print(f"{burn_history.stats()['days']} day(s) of burn history kept")
+        return 0
+    except Exception as e:
+        print(f"Failed to capture burn history: {e}")
+        return 1
+    finally:
+        conn.close()
+
+def export(fmt: str, output: str) -> int:
+    """Write the project + budget export to a columnar file for BI tools"""
+    if not arrow_available():
+        print("Columnar exports need pyarrow (pip install pyarrow).")
+        return 1
+    path = output or f"projects_budgets_{date.today().strftime('%Y%m%d')}.{fmt}"
+
+    conn = get_db_connection()
+    if not conn:
+        print("Database unavailable.")
+        return 1
+
+    try:
+        rows = write_export(conn, path, fmt, settings.EXPORT_ARROW_BATCH_SIZE, settings.EXPORT_PARQUET_ROW_GROUP_ROWS)
+        print(f"Wrote {rows} rows to {path}")
+        return 0
+    except Exception as e:
+        print(f"Failed to export: {e}")
+        return 1
+    finally:
+        conn.close()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Project Analytics management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    indexes = commands.add_parser("ensure-indexes", help="check for and create the indexes the analytics queries need")
+    indexes.add_argument("--dry-run", action="store_true", help="only report missing indexes (exit 1 if any)")
+
+    commands.add_parser("capture-burn", help="snapshot today's budget burn into the burn history")
+
+    exporter = commands.add_parser("export", help="write projects with their budgets as an Arrow IPC file or Parquet")
+    exporter.add_argument("--format", dest="fmt", choices=("arrow", "parquet"), default="parquet")
+    exporter.add_argument("--output", help="file to write (default: projects_budgets_YYYYMMDD.<format>)")
+
+    args = parser.parse_args()
+    if args.command == "ensure-indexes":
+        return ensure_indexes(args.dry_run)
+    if args.command == "capture-burn":
+        return capture_burn()
+    if args.command == "export":
+        return export(args.fmt, args.output)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
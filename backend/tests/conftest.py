@@ -0,0 +1,19 @@
+"""
+Test setup: the app runs in-process against generated SQLite databases (benchmarks/sqlite_shim.py)
+"""
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BENCHMARKS_DIR = BACKEND_DIR.parent / "benchmarks"
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+# Settings are read at import time; every request must reach the database
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ["ENVIRONMENT"] = "dev"
+os.environ["ANALYTICS_CACHE_ENABLED"] = "false"
+os.environ["ROLLUP_ENABLED"] = "false"
+os.environ["BURN_HISTORY_ENABLED"] = "false"
+os.environ["SNAPSHOT_ENABLED"] = "false"
@@ -0,0 +1,101 @@
+"""
+AdmissionLimiter: slots, FIFO hand-over, rejection, and no slot lost when a waiter gives up
+"""
+import asyncio
+import pytest
+import core.admission as admission
+from core.admission import AdmissionLimiter, Saturated
+
+def make_limiter(concurrency=1, queue_size=2, queue_timeout=0.05):
+    return AdmissionLimiter("test", concurrency, queue_size, queue_timeout, timeout_ms=0)
+
+def test_admits_up_to_concurrency_then_queues_and_hands_over():
+    async def scenario():
+        limiter = make_limiter(concurrency=1, queue_timeout=1.0)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["waiting"] == 1
+        assert not waiter.done()
+
+        limiter.release()
+        await waiter
+        assert limiter.stats()["active"] == 1
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0
+    assert stats["admitted"] == 2
+    assert stats["queued"] == 1
+
+def test_rejects_when_the_queue_is_full():
+    async def scenario():
+        limiter = make_limiter(concurrency=1, queue_size=0)
+        await limiter.acquire()
+        with pytest.raises(Saturated):
+            await limiter.acquire()
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected"] == 1
+    assert stats["active"] == 0
+
+def test_queue_timeout_frees_nothing_it_did_not_get():
+    async def scenario():
+        limiter = make_limiter(concurrency=1)
+        await limiter.acquire()
+        with pytest.raises(Saturated):
+            await limiter.acquire()
+        assert limiter.stats()["waiting"] == 0
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["timeouts"] == 1
+    assert stats["active"] == 0
+
+def test_slot_handed_over_as_the_queue_wait_times_out_is_passed_on(monkeypatch):
+    """release() completes the waiter's future in the same tick wait_for gives up (Python 3.12+)"""
+    limiter = make_limiter(concurrency=1)
+
+    async def wait_for_racing_release(future, timeout):
+        limiter.release()
+        assert future.done()
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        await limiter.acquire()
+        monkeypatch.setattr(admission.asyncio, "wait_for", wait_for_racing_release)
+        with pytest.raises(Saturated):
+            await limiter.acquire()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0
+    assert stats["waiting"] == 0
+
+def test_slot_handed_over_to_a_cancelled_waiter_is_passed_on():
+    async def scenario():
+        limiter = make_limiter(concurrency=1, queue_timeout=1.0)
+        await limiter.acquire()
+        first = asyncio.ensure_future(limiter.acquire())
+        second = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+
+        limiter.release()
+        first.cancel()
+        try:
+            await first
+            # Some Python versions let wait_for return the completed hand-over despite the cancel
+            limiter.release()
+        except asyncio.CancelledError:
+            pass
+        await second
+        assert limiter.stats()["active"] == 1
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0
@@ -0,0 +1,25 @@
+"""
+Burn forecast: the portfolio burn rate is the one its projection uses
+"""
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from core.burn_history import BURN_DTYPE, BurnHistory
+
+def test_portfolio_rate_matches_its_projection(tmp_path):
+    history = BurnHistory(str(tmp_path))
+    as_of = date(2026, 10, 16)
+    end = (as_of + timedelta(days=10)).toordinal()
+    for offset in range(5):
+        day = as_of - timedelta(days=4 - offset)
+        rows = np.array([
+            (1, 10, 1000.0, 500.0 + 100.0 * offset, end),   # burning 100/day
+            (2, 20, 1000.0, 800.0 - 50.0 * offset, end)     # corrected down 50/day
+        ], dtype=BURN_DTYPE)
+        history.write(day, rows)
+
+    portfolio = history.forecast(30)['portfolio']
+    burnt_now = 900.0 + 600.0
+    assert portfolio['burnt'] == pytest.approx(burnt_now)
+    assert portfolio['burn_rate_per_day'] == pytest.approx(100.0)
+    assert portfolio['projected_burnt'] == pytest.approx(burnt_now + portfolio['burn_rate_per_day'] * 10)
@@ -0,0 +1,69 @@
+"""
+Circuit breaker transitions, and connection checkout when a pooled connection turns out to be dead
+"""
+import pytest
+from mysql.connector import errors
+import core.database as database
+from core.config import settings
+from core.database import CircuitBreaker
+
+def test_breaker_opens_after_consecutive_failures_and_closes_on_success(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failures=2, reset_timeout=10.0)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+    assert breaker.retry_after() == 10.0
+
+    # Half-open: one trial once reset_timeout has passed, the rest keep failing fast
+    now[0] += 10.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+    assert breaker.stats()["opens"] == 1
+
+def test_breaker_failed_trial_keeps_it_open(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failures=1, reset_timeout=5.0)
+    breaker.record_failure()
+    now[0] += 5.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+class DeadConnection:
+    """A pooled connection whose server side went away while it sat idle"""
+
+    closed = False
+
+    def cursor(self, *args, **kwargs):
+        raise errors.OperationalError("MySQL Connection not available.")
+
+    def rollback(self):
+        raise errors.OperationalError("MySQL Connection not available.")
+
+    def close(self):
+        self.closed = True
+
+def test_dead_connection_is_discarded_not_leaked(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_ENABLED", True)
+    monkeypatch.setattr(settings, "DB_POOL_MIN_SIZE", 0)
+    monkeypatch.setattr(settings, "DB_POOL_PRE_PING", False)
+    opened = []
+    monkeypatch.setattr(database, "_connect", lambda: opened.append(DeadConnection()) or opened[-1])
+    database.close_pool()
+    try:
+        assert database.acquire_connection(timeout_ms=1000) is None
+        pool = database.get_pool()
+        assert pool.stats()["size"] == 0
+        assert opened[0].closed
+    finally:
+        database.close_pool()
@@ -0,0 +1,96 @@
+"""
+GET /api/projects costs a fixed number of queries whatever the project count (no N+1 budget lookups)
+"""
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+import sqlite_shim
+from datagen import generate
+from main import app
+from core.cache import analytics_cache, encoded_cache
+
+# 50 and 500 projects (about four budgets each)
+SMALL_BUDGETS = 200
+LARGE_BUDGETS = 2000
+
+# The per-project fields of the original (one budget query per project) implementation
+PROJECT_FIELDS = {
+    "project_id", "project_name", "client_id", "client_name", "project_manager", "manager_name",
+    "start_date", "end_date", "status", "created_at", "updated_at",
+    "total_allocated", "total_burnt", "total_remaining", "budget_variance", "status_category", "days_overdue"
+}
+
+@pytest.fixture(scope="module")
+def databases(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("db")
+    paths = {}
+    for name, budgets in (("small", SMALL_BUDGETS), ("large", LARGE_BUDGETS)):
+        paths[name] = str(directory / f"{name}.db")
+        generate(paths[name], budgets)
+    return paths
+
+@pytest.fixture
+def list_projects(monkeypatch):
+    """Request a path against a database file; returns (queries executed, parsed body)"""
+    executed = []
+    execute = sqlite_shim.Cursor.execute
+
+    def counting_execute(cursor, query, params=()):
+        if not query.lstrip().upper().startswith("SET "):
+            executed.append(query)
+        return execute(cursor, query, params)
+
+    monkeypatch.setattr(sqlite_shim.Cursor, "execute", counting_execute)
+    client = TestClient(app)
+
+    def run(db_path: str, path: str):
+        sqlite_shim.install(db_path)
+        # The data version probe and encoded bodies are cached regardless of the database behind them
+        analytics_cache.invalidate()
+        encoded_cache.invalidate()
+        executed.clear()
+        response = client.get(path)
+        assert response.status_code == 200
+        return len(executed), response.json()
+
+    yield run
+    import core.database as database
+    database.close_pool()
+
+@pytest.mark.parametrize("path", ["/api/projects", "/api/projects?limit=25", "/api/projects?status_category=active"])
+def test_query_count_does_not_grow_with_projects(databases, list_projects, path):
+    small_queries, small = list_projects(databases["small"], path)
+    large_queries, large = list_projects(databases["large"], path)
+
+    if "limit" not in path:
+        assert len(large) > 5 * len(small)
+    assert small_queries == large_queries
+    assert large_queries <= 3
+
+def test_response_shape(databases, list_projects):
+    _, projects = list_projects(databases["small"], "/api/projects")
+    assert projects
+    for project in projects:
+        assert set(project) == PROJECT_FIELDS
+        assert project["status_category"] in ("active", "overdue", "completed")
+        assert project["total_remaining"] == pytest.approx(project["total_allocated"] - project["total_burnt"], abs=0.01)
+        assert isinstance(project["days_overdue"], int)
+
+    conn = sqlite3.connect(databases["small"])
+    try:
+        totals = {
+            project_id: (allocated, burnt)
+            for project_id, allocated, burnt in conn.execute(
+                "SELECT project_id, SUM(allocated_amount), SUM(burnt_amount) FROM budgets GROUP BY project_id"
+            )
+        }
+    finally:
+        conn.close()
+    for project in projects:
+        allocated, burnt = totals.get(project["project_id"], (0.0, 0.0))
+        assert project["total_allocated"] == pytest.approx(allocated)
+        assert project["total_burnt"] == pytest.approx(burnt)
+
+    _, page = list_projects(databases["small"], "/api/projects?limit=10")
+    assert set(page) == {"items", "next_cursor"}
+    assert page["items"] == projects[:10]
@@ -0,0 +1,73 @@
+"""
+Budget rollup: a deleted budget leaves the totals (and the body cached under the new ETag) at once
+"""
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+import sqlite_shim
+from datagen import generate
+from main import app
+import core.analytics as analytics
+import core.database as database
+from core.cache import analytics_cache, encoded_cache
+from core.config import settings
+from core.rollup import BudgetRollup
+
+@pytest.fixture
+def rollup_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "rollup.db")
+    generate(path, 200)
+    monkeypatch.setattr(settings, "ROLLUP_ENABLED", True)
+    monkeypatch.setattr(settings, "ANALYTICS_CACHE_ENABLED", True)
+    # Probe the data version on every request, as after ANALYTICS_VERSION_TTL
+    monkeypatch.setattr(settings, "ANALYTICS_VERSION_TTL", 0)
+    monkeypatch.setattr(analytics, "budget_rollup", BudgetRollup())
+    sqlite_shim.install(path)
+    analytics_cache.invalidate()
+    encoded_cache.invalidate()
+    yield path
+    analytics_cache.invalidate()
+    encoded_cache.invalidate()
+    database.close_pool()
+
+def _sql_totals(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute("SELECT project_id, SUM(allocated_amount) FROM budgets GROUP BY project_id"))
+    finally:
+        conn.close()
+
+def _allocated(projects: list) -> dict:
+    return {p["project_id"]: p["total_allocated"] for p in projects}
+
+def test_deleted_budget_is_not_served_or_revalidated_from_stale_totals(rollup_db):
+    client = TestClient(app)
+    first = client.get("/api/projects")
+    assert first.status_code == 200
+    assert analytics.budget_rollup.ready
+
+    conn = sqlite3.connect(rollup_db)
+    try:
+        project_id, budget_id = conn.execute(
+            "SELECT project_id, MIN(budget_id) FROM budgets GROUP BY project_id HAVING COUNT(*) > 1 LIMIT 1"
+        ).fetchone()
+        conn.execute("DELETE FROM budgets WHERE budget_id = ?", (budget_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    expected = _sql_totals(rollup_db)[project_id]
+
+    second = client.get("/api/projects", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert _allocated(second.json())[project_id] == pytest.approx(expected)
+
+    # A background refresh changes nothing, so revalidating keeps the (correct) body
+    conn = database.acquire_connection()
+    try:
+        analytics.budget_rollup.refresh(conn)
+    finally:
+        database.release_connection(conn)
+    third = client.get("/api/projects", headers={"If-None-Match": second.headers["etag"]})
+    assert third.status_code == 304
+    assert _allocated(client.get("/api/projects").json())[project_id] == pytest.approx(expected)
@@ -0,0 +1,59 @@
+"""
+SingleFlight: concurrent identical calls share one execution, and a departing caller does not cancel it
+"""
+import asyncio
+import pytest
+from core.singleflight import SingleFlight
+
+def test_concurrent_calls_with_the_same_key_run_once():
+    calls = []
+
+    async def load(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def scenario():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("key", "load", load, 21) for _ in range(5)))
+        again = await flight.do("key", "load", load, 21)
+        return results, again, flight.stats()
+
+    results, again, stats = asyncio.run(scenario())
+    assert results == [42] * 5
+    assert again == 42
+    assert calls == [21, 21]
+    assert stats["executed"] == 2
+    assert stats["coalesced"] == 4
+    assert stats["in_flight"] == 0
+
+def test_errors_reach_every_caller():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("key", "fail", fail) for _ in range(3)), return_exceptions=True)
+        return results, flight.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert stats["errors"] == 1
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def load():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        flight = SingleFlight("test")
+        leaving = asyncio.ensure_future(flight.do("key", "load", load))
+        staying = asyncio.ensure_future(flight.do("key", "load", load))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,44 @@
+"""
+Live stream: no subscriber without a consumed body, and only stream tokens in the URL
+"""
+import asyncio
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+import api.dependencies as dependencies
+from api.project_stream import stream_dashboard
+from core.live import dashboard_broadcaster
+from core.security import create_access_token
+
+class DisconnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return True
+
+def test_unsent_response_does_not_subscribe():
+    async def scenario():
+        await stream_dashboard(DisconnectedRequest(), current_user={})
+        return dashboard_broadcaster.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["subscribers"] == 0
+    assert not stats["running"]
+
+def _token(token_type: str) -> str:
+    return create_access_token({"sub": "frontend_service", "type": token_type}, timedelta(minutes=1))
+
+def test_url_accepts_stream_tokens_only(monkeypatch):
+    monkeypatch.setattr(dependencies, "REQUIRE_AUTH", True)
+
+    async def user(header=None, query=None):
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=header) if header else None
+        return await dependencies.get_stream_user(credentials, query)
+
+    assert asyncio.run(user(query=_token("stream_token")))["type"] == "stream_token"
+    assert asyncio.run(user(header=_token("service_token")))["type"] == "service_token"
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(user(query=_token("service_token")))
+    assert error.value.status_code == 403
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(user(header=_token("stream_token")))
+    assert error.value.status_code == 403
@@ -0,0 +1,52 @@
+"""
+Compare two benchmark result files
+
+    python benchmarks/compare.py results/before.json results/after.json --threshold 0.15
+
+Exits with status 1 if any endpoint's p50 latency regressed by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+def load(path: str) -> Tuple[Dict[Tuple[str, int], dict], dict]:
+    with open(path) as f:
+        data = json.load(f)
+    return {
+        (entry["endpoint"], level["concurrency"]): level
+        for entry in data["results"]
+        for level in entry["levels"]
+    }, data["meta"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed p50 slowdown (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    base, base_meta = load(args.baseline)
+    cand, cand_meta = load(args.candidate)
+    print(f"baseline {base_meta.get('commit')}  vs  candidate {cand_meta.get('commit')}")
+    print(f"{'endpoint':20s} {'conc':>4s} {'p50 base':>10s} {'p50 cand':>10s} {'change':>8s} {'p99 change':>10s} {'rps change':>10s}")
+
+    regressions = 0
+    for key in sorted(base.keys() & cand.keys()):
+        b, c = base[key], cand[key]
+        p50_change = c["latency_ms"]["p50"] / b["latency_ms"]["p50"] - 1 if b["latency_ms"]["p50"] else 0.0
+        p99_change = c["latency_ms"]["p99"] / b["latency_ms"]["p99"] - 1 if b["latency_ms"]["p99"] else 0.0
+        rps_change = c["throughput_rps"] / b["throughput_rps"] - 1 if b["throughput_rps"] else 0.0
+        flag = ""
+        if p50_change > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(
+            f"{key[0]:20s} {key[1]:>4d} {b['latency_ms']['p50']:>10.2f} {c['latency_ms']['p50']:>10.2f} "
+            f"{p50_change:>+8.1%} {p99_change:>+10.1%} {rps_change:>+10.1%}{flag}"
+        )
+
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
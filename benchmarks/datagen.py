@@ -0,0 +1,112 @@
+"""
+Deterministic synthetic data for the analytics benchmarks
+"""
+import os
+import random
+import sqlite3
+from datetime import date, datetime, timedelta
+
+SCALES = {
+    "1k": 1_000,
+    "100k": 100_000,
+    "1m": 1_000_000
+}
+
+SCHEMA = """
+    CREATE TABLE clients (
+        client_id INTEGER PRIMARY KEY,
+        client_name TEXT
+    );
+    CREATE TABLE employees (
+        employee_id INTEGER PRIMARY KEY,
+        first_name TEXT,
+        last_name TEXT
+    );
+    CREATE TABLE projects (
+        project_id INTEGER PRIMARY KEY,
+        project_name TEXT,
+        client_id INTEGER,
+        project_manager INTEGER,
+        start_date DATE,
+        end_date DATE,
+        status INTEGER,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP
+    );
+    CREATE TABLE budgets (
+        budget_id INTEGER PRIMARY KEY,
+        project_id INTEGER,
+        budget_name TEXT,
+        budget_type TEXT,
+        allocated_amount REAL,
+        burnt_amount REAL,
+        remaining_amount REAL,
+        status INTEGER,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP
+    );
+    CREATE INDEX idx_budgets_project ON budgets (project_id);
+    CREATE INDEX idx_projects_status_end ON projects (status, end_date);
+    CREATE INDEX idx_projects_manager ON projects (project_manager);
+"""
+
+BUDGET_TYPES = ("labor", "materials", "licenses", "travel", "contingency")
+
+def sizes(budgets: int) -> dict:
+    """Row counts per table for a target number of budgets (about four budgets per project)"""
+    projects = max(1, budgets // 4)
+    return {
+        "budgets": budgets,
+        "projects": projects,
+        "clients": max(10, projects // 50),
+        "employees": max(10, projects // 20)
+    }
+
+def generate(path: str, budgets: int, seed: int = 42) -> dict:
+    """Write a fresh SQLite database with the given number of budgets; same seed, same data"""
+    if os.path.exists(path):
+        os.remove(path)
+    counts = sizes(budgets)
+    rng = random.Random(seed)
+    today = date.today()
+    epoch = datetime.combine(today, datetime.min.time()) - timedelta(days=365)
+
+    def stamp() -> str:
+        # Spread updated_at over the last year, like a table edited over time
+        return (epoch + timedelta(seconds=rng.randint(0, 365 * 86400))).isoformat(" ")
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO clients VALUES (?, ?)",
+            ((i, f"Client {i}") for i in range(1, counts["clients"] + 1))
+        )
+        conn.executemany(
+            "INSERT INTO employees VALUES (?, ?, ?)",
+            ((i, f"First{i}", f"Last{i}") for i in range(1, counts["employees"] + 1))
+        )
+
+        def projects():
+            for pid in range(1, counts["projects"] + 1):
+                start = today - timedelta(days=rng.randint(0, 1000))
+                end = start + timedelta(days=rng.randint(30, 540)) if rng.random() > 0.03 else None
+                manager = rng.randint(1, counts["employees"]) if rng.random() > 0.02 else None
+                status = rng.choice((0, 1, 1, 2))
+                yield (pid, f"Project {pid}", rng.randint(1, counts["clients"]), manager,
+                       start.isoformat(), end.isoformat() if end else None, status, stamp(), stamp())
+
+        conn.executemany("INSERT INTO projects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", projects())
+
+        def budget_rows():
+            for bid in range(1, budgets + 1):
+                allocated = round(rng.uniform(1_000, 80_000), 2)
+                burnt = round(allocated * rng.uniform(0.1, 1.35), 2)
+                yield (bid, rng.randint(1, counts["projects"]), f"Budget {bid}", rng.choice(BUDGET_TYPES),
+                       allocated, burnt, round(allocated - burnt, 2), 1, stamp(), stamp())
+
+        conn.executemany("INSERT INTO budgets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", budget_rows())
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
@@ -0,0 +1,217 @@
+"""
+Latency / throughput / memory benchmark for the analytics endpoints
+
+    python benchmarks/run.py --scale 100k --concurrency 1,8,32 --requests 100
+
+By default the app runs in-process against a generated SQLite database
+(see sqlite_shim.py); pass --url to measure a running server instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httpx
+from datagen import SCALES, generate
+
+ENDPOINTS = {
+    "projects": "/api/projects",
+    "summary": "/api/projects/summary",
+    "manager-leaderboard": "/api/projects/manager-leaderboard",
+    "timeline": "/api/projects/timeline",
+    "risks": "/api/projects/risks",
+    "budget": "/api/projects/{project_id}/budget",
+    "dashboard": "/api/projects/dashboard"
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="1k", help="number of budgets to generate")
+    parser.add_argument("--budgets", type=int, help="explicit budget count (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=3, help="unmeasured requests before each run")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated subset of endpoints")
+    parser.add_argument("--db", help="SQLite file to (re)use; defaults to one per scale and seed in the temp dir")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild the SQLite file even if it exists")
+    parser.add_argument("--cache", action="store_true", help="leave the result caches, rollup and query coalescing on")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--token", help="bearer token for --url against a prod-mode server")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    return parser.parse_args()
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+async def run_level(client: httpx.AsyncClient, path: str, project_ids: list, concurrency: int, total: int) -> dict:
+    """Fire total requests with at most concurrency in flight; returns latency stats"""
+    rng = random.Random(concurrency)
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(path.format(project_id=rng.choice(project_ids)))
+    latencies, errors, sizes = [], 0, 0
+
+    async def worker():
+        nonlocal errors, sizes
+        while not queue.empty():
+            url = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            sizes += len(response.content)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ms) / len(ms), 3),
+            "p50": round(percentile(ms, 50), 3),
+            "p90": round(percentile(ms, 90), 3),
+            "p95": round(percentile(ms, 95), 3),
+            "p99": round(percentile(ms, 99), 3),
+            "max": round(ms[-1], 3)
+        },
+        "avg_response_bytes": sizes // total
+    }
+
+async def traced_peak_mb(client: httpx.AsyncClient, url: str) -> float:
+    """Peak Python heap growth while serving one request (in-process only)"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        await client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round((peak - base) / (1024 * 1024), 2)
+
+async def benchmark(args, client: httpx.AsyncClient, in_process: bool) -> list:
+    response = await client.get("/api/projects", params={"fields": "project_id", "limit": 1000})
+    response.raise_for_status()
+    project_ids = [p["project_id"] for p in response.json()["items"]] or [1]
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    results = []
+    for name in [e.strip() for e in args.endpoints.split(",") if e.strip()]:
+        path = ENDPOINTS[name]
+        first_url = path.format(project_id=project_ids[0])
+        for _ in range(args.warmup):
+            await client.get(first_url)
+        entry = {"endpoint": name, "path": path, "levels": []}
+        if in_process:
+            entry["peak_traced_mb"] = await traced_peak_mb(client, first_url)
+        for concurrency in levels:
+            level = await run_level(client, path, project_ids, concurrency, args.requests)
+            entry["levels"].append(level)
+            print(
+                f"{name:20s} c={concurrency:<4d} p50={level['latency_ms']['p50']:>9.2f}ms "
+                f"p99={level['latency_ms']['p99']:>9.2f}ms {level['throughput_rps']:>8.1f} req/s"
+                + (f" errors={level['errors']}" if level["errors"] else "")
+            )
+        results.append(entry)
+    return results
+
+async def main():
+    args = parse_args()
+    budgets = args.budgets or SCALES[args.scale]
+    meta = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "requests_per_level": args.requests,
+        "concurrency": args.concurrency
+    }
+
+    if args.url:
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+        meta.update({"target": args.url})
+        async with httpx.AsyncClient(base_url=args.url, headers=headers, timeout=300) as client:
+            results = await benchmark(args, client, in_process=False)
+    else:
+        # Must be set before the backend modules read their settings
+        os.environ.setdefault("ENVIRONMENT", "dev")
+        # Without --cache, turn off every layer that can answer without querying
+        # (result/encoded-body cache, budget rollup, coalesced loads; the snapshot is off by default)
+        cached = "true" if args.cache else "false"
+        for name in ("ANALYTICS_CACHE_ENABLED", "ROLLUP_ENABLED", "QUERY_COALESCING_ENABLED"):
+            os.environ[name] = cached
+        os.environ.setdefault("SNAPSHOT_ENABLED", "false")
+        os.environ.setdefault("DB_POOL_MAX_SIZE", "32")
+        os.environ.setdefault("DB_EXECUTOR_WORKERS", "32")
+
+        db_path = args.db or os.path.join(tempfile.gettempdir(), f"projex_bench_{budgets}_{args.seed}.db")
+        if args.regenerate or not os.path.exists(db_path):
+            start = time.perf_counter()
+            counts = generate(db_path, budgets, seed=args.seed)
+            print(f"Generated {counts} in {time.perf_counter() - start:.1f}s -> {db_path}")
+
+        import sqlite_shim
+        sqlite_shim.install(db_path)
+        from main import app
+        from core.database import close_pool, shutdown_executor
+        from datagen import sizes
+
+        meta.update({"target": "in-process (sqlite)", "budgets": budgets, "seed": args.seed,
+                     "rows": sizes(budgets), "analytics_cache": args.cache})
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+                results = await benchmark(args, client, in_process=True)
+        finally:
+            shutdown_executor()
+            close_pool()
+
+    meta["peak_rss_mb"] = peak_rss_mb()
+    output = Path(args.output) if args.output else (
+        Path(__file__).resolve().parent / "results" / f"{datetime.now():%Y%m%d-%H%M%S}-{meta['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    print(f"Peak RSS {meta['peak_rss_mb']} MiB; results written to {output}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+SQLite stand-in for the MySQL connections opened by core.database
+"""
+import sqlite3
+from datetime import date
+
+def _concat(*parts):
+    # MySQL CONCAT returns NULL if any argument is NULL
+    if any(p is None for p in parts):
+        return None
+    return "".join(str(p) for p in parts)
+
+class Cursor:
+    """The subset of the mysql.connector cursor API core.database uses"""
+
+    def __init__(self, conn: sqlite3.Connection, dictionary: bool):
+        self._cursor = conn.cursor()
+        self._dictionary = dictionary
+        self._columns = ()
+        self._description = None
+
+    def execute(self, query: str, params=()):
+        if query.lstrip().upper().startswith("SET "):
+            # MySQL session settings (e.g. max_execution_time) have no SQLite equivalent
+            self._columns = ()
+            self._description = None
+            return
+        params = tuple(p.isoformat() if isinstance(p, date) else p for p in (params or ()))
+        self._cursor.execute(query.replace("%s", "?"), params)
+        self._description = self._cursor.description
+        self._columns = tuple(d[0] for d in self._description or ())
+
+    @property
+    def description(self):
+        # SQLite reports no column types (type_code None), so nothing is treated as DECIMAL
+        return self._description
+
+    @property
+    def column_names(self):
+        return self._columns
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self._columns, row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cursor.fetchall()]
+
+    def fetchmany(self, size: int = 1):
+        return [self._row(r) for r in self._cursor.fetchmany(size)]
+
+    def close(self):
+        self._cursor.close()
+
+class Connection:
+    """One SQLite connection behaving like a mysql.connector connection"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self._conn.create_function("CONCAT", -1, _concat, deterministic=True)
+
+    def cursor(self, dictionary: bool = False, buffered=None, **kwargs):
+        return Cursor(self._conn, dictionary)
+
+    def ping(self, reconnect: bool = False):
+        self._conn.execute("SELECT 1")
+
+    def is_connected(self) -> bool:
+        return True
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+def install(path: str):
+    """Point core.database at the SQLite file instead of MySQL"""
+    import core.database as database
+    database._connect = lambda: Connection(path)
+    database.close_pool()